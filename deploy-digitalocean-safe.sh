@@ -54,8 +54,9 @@ else
     cd liquidation-heatmap
 fi
 
-# Create data directory
+# Create data directory, owned by the container's user (appuser, uid 1000)
 mkdir -p data
+sudo chown -R 1000:1000 data
 
 # Build and run with Docker Compose
 echo "🏗️ Building and starting application..."
@@ -0,0 +1,349 @@
+import bisect
+import heapq
+import json
+import math
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+
+def extract_cluster_peaks(heatmap_df: pd.DataFrame, current_price: float, top: int = 20) -> List[Dict]:
+    """
+    Find liquidation cluster peaks: local maxima of the heatmap's price
+    profile, strongest first. Peaks below the current price are long
+    liquidations, peaks above are short liquidations.
+    """
+    if heatmap_df is None or heatmap_df.empty:
+        return []
+    if 'timestamp' in heatmap_df.columns:
+        heatmap_df = heatmap_df.groupby('price', as_index=False)['total_liquidation_volume'].sum()
+    prices = heatmap_df['price'].to_numpy(dtype=float)
+    volumes = heatmap_df['total_liquidation_volume'].to_numpy(dtype=float)
+    if len(volumes) < 3:
+        return []
+
+    inner = volumes[1:-1]
+    is_peak = (inner >= volumes[:-2]) & (inner > volumes[2:]) & (inner > 0)
+    indices = np.nonzero(is_peak)[0] + 1
+    indices = indices[np.argsort(-volumes[indices])][:top]
+    return [
+        {
+            'price': float(prices[i]),
+            'intensity': float(volumes[i]),
+            'side': 'long' if prices[i] < current_price else 'short'
+        }
+        for i in indices
+    ]
+
+
+class AlertRule:
+    def __init__(self, rule_id: str, symbol: str, max_distance_pct: float, min_intensity: float,
+                 exchange: str = 'binance', side: str = None, user_id: str = None,
+                 hysteresis: float = 0.5, cooldown_seconds: float = 300):
+        """
+        Fire when price is within `max_distance_pct` percent of a cluster
+        whose intensity is at least `min_intensity`. After firing, the rule
+        re-arms for that cluster only once price moves back out past
+        `max_distance_pct * (1 + hysteresis)`, and never within
+        `cooldown_seconds`. `side` restricts it to 'long' or 'short' clusters.
+        """
+        self.rule_id = rule_id
+        self.symbol = symbol
+        self.exchange = exchange
+        self.max_distance_pct = max_distance_pct
+        self.min_intensity = min_intensity
+        self.side = side
+        self.user_id = user_id
+        self.hysteresis = hysteresis
+        self.cooldown_seconds = cooldown_seconds
+
+    def band(self, peak_price: float, widen: float = 0.0) -> Tuple[float, float]:
+        """Prices p with |p - peak| / p <= pct, optionally widened by a factor."""
+        pct = min(self.max_distance_pct * (1 + widen) / 100, 0.99)
+        return peak_price / (1 + pct), peak_price / (1 - pct)
+
+    def cluster_key(self, peak_price: float) -> int:
+        """Bucket peak prices so a cluster that drifts slightly keeps its identity."""
+        return round(math.log(peak_price) / math.log1p(self.max_distance_pct / 100))
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'AlertRule':
+        return cls(**spec)
+
+
+class IntervalIndex:
+    def __init__(self, intervals: List[Tuple[float, float, object]]):
+        """
+        Static centered interval tree: `stab(x)` returns the payloads of all
+        intervals containing x in O(log n + k).
+        """
+        self._root = self._build(intervals)
+        self.size = len(intervals)
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(value for lo, hi, _ in intervals for value in (lo, hi))
+        center = endpoints[len(endpoints) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        by_lo = sorted(here, key=lambda interval: interval[0])
+        by_hi = sorted(here, key=lambda interval: -interval[1])
+        return (center, by_lo, by_hi, self._build(left), self._build(right))
+
+    def stab(self, x: float) -> List:
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_lo, by_hi, left, right = node
+            if x < center:
+                for lo, _, payload in by_lo:
+                    if lo > x:
+                        break
+                    found.append(payload)
+                node = left
+            elif x > center:
+                for _, hi, payload in by_hi:
+                    if hi < x:
+                        break
+                    found.append(payload)
+                node = right
+            else:
+                found.extend(payload for _, _, payload in by_lo)
+                break
+        return found
+
+
+class AlertSink(ABC):
+    """Destination for fired alerts. `send` is called on the ticking thread and must not block."""
+
+    @abstractmethod
+    def send(self, alert: Dict) -> None:
+        ...
+
+
+class LogSink(AlertSink):
+    def send(self, alert: Dict) -> None:
+        print(f"🚨 {alert['symbol']} at ${alert['price']:,.2f} is {alert['distance_percent']:.2f}% from "
+              f"a {alert['side']} cluster at ${alert['cluster_price']:,.2f} "
+              f"(intensity {alert['cluster_intensity']:,.0f}, rule {alert['rule_id']})")
+
+
+class WebhookSink(AlertSink):
+    def __init__(self, url: str, timeout: float = 5.0, max_pending: int = 1000):
+        """
+        POST each alert as JSON to `url`. Delivery runs on a background
+        thread so a slow endpoint never holds up the ticking thread; alerts
+        beyond `max_pending` undelivered ones are dropped.
+        """
+        self.url = url
+        self.timeout = timeout
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._deliver, name='alert-webhook', daemon=True)
+        self._thread.start()
+
+    def send(self, alert: Dict) -> None:
+        try:
+            self._pending.put_nowait(alert)
+        except queue.Full:
+            print(f"Dropping alert {alert['rule_id']}: webhook delivery is backed up")
+
+    def _deliver(self) -> None:
+        while True:
+            alert = self._pending.get()
+            try:
+                requests.post(self.url, data=json.dumps(alert, default=str),
+                              headers={'Content-Type': 'application/json'}, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Error delivering alert {alert['rule_id']}: {e}")
+            finally:
+                self._pending.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued alert was attempted."""
+        self._pending.join()
+
+
+class MemorySink(AlertSink):
+    def __init__(self):
+        """Keeps alerts in a list; a local stand-in for real sinks."""
+        self.alerts: List[Dict] = []
+
+    def send(self, alert: Dict) -> None:
+        self.alerts.append(alert)
+
+
+class _SymbolIndex:
+    def __init__(self):
+        # Rules sorted by min_intensity so a peak's qualifying rules are a prefix
+        self.rules: List[AlertRule] = []
+        self.thresholds: List[float] = []
+        self.peaks: List[Dict] = []
+        self.index = IntervalIndex([])
+        # Fired (rule, cluster) pairs waiting to re-arm, as lazy heaps on their exit band
+        self.active: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        self.exit_below: List = []  # max-heap on band low: (-low, key)
+        self.exit_above: List = []  # min-heap on band high: (high, key)
+
+
+class AlertEngine:
+    def __init__(self, sinks: List[AlertSink] = None):
+        """
+        Alert engine for price approaching liquidation clusters.
+
+        Each heatmap update turns (rule, cluster peak) pairs into price
+        intervals held in an interval tree, so a price tick finds its
+        triggered rules in O(log n + k) instead of scanning every rule and
+        heatmap bin.
+        """
+        self.sinks = list(sinks or [])
+        self._symbols: Dict[Tuple[str, str], _SymbolIndex] = {}
+        # (rule, cluster) pairs in cooldown: when it ends, plus a min-heap on
+        # that time so expired entries are dropped instead of piling up
+        self._cooldown_until: Dict[Tuple[str, int], float] = {}
+        self._cooldowns: List = []  # (until, key)
+        self._lock = threading.Lock()
+
+    def _symbol(self, exchange: str, symbol: str) -> _SymbolIndex:
+        key = (exchange, symbol)
+        if key not in self._symbols:
+            self._symbols[key] = _SymbolIndex()
+        return self._symbols[key]
+
+    def add_sink(self, sink: AlertSink) -> None:
+        self.sinks.append(sink)
+
+    def add_rule(self, rule: AlertRule) -> None:
+        self.add_rules([rule])
+
+    def add_rules(self, rules: List[AlertRule]) -> None:
+        """Add rules, rebuilding each affected symbol's index once."""
+        with self._lock:
+            touched = {}
+            for rule in rules:
+                state = self._symbol(rule.exchange, rule.symbol)
+                position = bisect.bisect_right(state.thresholds, rule.min_intensity)
+                state.thresholds.insert(position, rule.min_intensity)
+                state.rules.insert(position, rule)
+                touched[id(state)] = state
+            for state in touched.values():
+                self._rebuild(state)
+
+    def remove_rule(self, rule_id: str) -> None:
+        with self._lock:
+            for state in self._symbols.values():
+                keep = [i for i, rule in enumerate(state.rules) if rule.rule_id != rule_id]
+                if len(keep) != len(state.rules):
+                    state.rules = [state.rules[i] for i in keep]
+                    state.thresholds = [state.thresholds[i] for i in keep]
+                    self._rebuild(state)
+
+    def update_heatmap(self, exchange: str, symbol: str, data: Dict) -> None:
+        """Re-extract cluster peaks from a new heatmap and rebuild the index."""
+        peaks = extract_cluster_peaks(data['heatmap_data'], data['current_price'])
+        with self._lock:
+            state = self._symbol(exchange, symbol)
+            state.peaks = peaks
+            self._rebuild(state)
+
+    def _rebuild(self, state: _SymbolIndex) -> None:
+        intervals = []
+        for peak in state.peaks:
+            qualifying = bisect.bisect_right(state.thresholds, peak['intensity'])
+            for rule in state.rules[:qualifying]:
+                if rule.side is None or rule.side == peak['side']:
+                    lo, hi = rule.band(peak['price'])
+                    intervals.append((lo, hi, (rule, peak)))
+        state.index = IntervalIndex(intervals)
+
+    def on_tick(self, exchange: str, symbol: str, price: float, timestamp: float = None) -> List[Dict]:
+        """Process a price tick; returns (and delivers) the alerts it fires."""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            state = self._symbols.get((exchange, symbol))
+            if state is None:
+                return []
+            self._rearm(state, price)
+            self._expire_cooldowns(now)
+
+            # One alert per rule per tick: the strongest cluster in range
+            best: Dict[str, Tuple[AlertRule, Dict]] = {}
+            for rule, peak in state.index.stab(price):
+                current = best.get(rule.rule_id)
+                if current is None or peak['intensity'] > current[1]['intensity']:
+                    best[rule.rule_id] = (rule, peak)
+
+            alerts = []
+            for rule, peak in best.values():
+                key = (rule.rule_id, rule.cluster_key(peak['price']))
+                if key in state.active:
+                    continue
+                if now < self._cooldown_until.get(key, float('-inf')):
+                    continue
+                low, high = rule.band(peak['price'], widen=rule.hysteresis)
+                state.active[key] = (low, high)
+                heapq.heappush(state.exit_below, (-low, key))
+                heapq.heappush(state.exit_above, (high, key))
+                if rule.cooldown_seconds > 0:
+                    self._cooldown_until[key] = now + rule.cooldown_seconds
+                    heapq.heappush(self._cooldowns, (now + rule.cooldown_seconds, key))
+                alerts.append({
+                    'rule_id': rule.rule_id,
+                    'user_id': rule.user_id,
+                    'exchange': exchange,
+                    'symbol': symbol,
+                    'price': price,
+                    'side': peak['side'],
+                    'cluster_price': peak['price'],
+                    'cluster_intensity': peak['intensity'],
+                    'distance_percent': abs(price - peak['price']) / price * 100,
+                    'timestamp': now
+                })
+
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f"Error sending alert {alert['rule_id']} to {type(sink).__name__}: {e}")
+        return alerts
+
+    def _rearm(self, state: _SymbolIndex, price: float) -> None:
+        """Release fired (rule, cluster) pairs whose exit band price has left."""
+        # Each pair sits in both heaps; entries whose band no longer matches
+        # the active one are stale leftovers and are simply discarded
+        while state.exit_below and -state.exit_below[0][0] > price:
+            low, key = heapq.heappop(state.exit_below)
+            if key in state.active and state.active[key][0] == -low:
+                del state.active[key]
+        while state.exit_above and state.exit_above[0][0] < price:
+            high, key = heapq.heappop(state.exit_above)
+            if key in state.active and state.active[key][1] == high:
+                del state.active[key]
+
+    def _expire_cooldowns(self, now: float) -> None:
+        """Forget (rule, cluster) pairs whose cooldown has passed."""
+        while self._cooldowns and self._cooldowns[0][0] <= now:
+            until, key = heapq.heappop(self._cooldowns)
+            if self._cooldown_until.get(key) == until:
+                del self._cooldown_until[key]
+
+    @classmethod
+    def from_file(cls, path: str, sinks: List[AlertSink] = None) -> 'AlertEngine':
+        """Load rules from a JSON list of AlertRule keyword arguments."""
+        engine = cls(sinks)
+        with open(path) as f:
+            engine.add_rules([AlertRule.from_dict(spec) for spec in json.load(f)])
+        return engine
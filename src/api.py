@@ -0,0 +1,271 @@
+"""
+HTTP API serving the latest liquidation heatmaps.
+
+Run with gunicorn using threads in a single worker so every poller shares
+one snapshot cache and one refresher:
+
+    gunicorn --chdir src --worker-class gthread --workers 1 --threads 32 \\
+        --bind 0.0.0.0:8000 api:app
+
+Endpoints:
+    GET /health
+    GET /v1/snapshots
+    GET /v1/<exchange>/<symbol>/heatmap     (symbol as BTC-USDT)
+    GET /v1/<exchange>/<symbol>/levels
+    GET /v1/<exchange>/<symbol>/leverage
+    GET /v1/<exchange>/<symbol>/heatmap.bin?since=<version>
+    GET /v1/heatmap_codec.js
+"""
+import json
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs
+
+from alerts import AlertEngine, LogSink, WebhookSink
+from data_fetcher import LiquidationDataFetcher
+from pairs import DEFAULT_PAIRS, parse_pairs
+from request_scheduler import BACKGROUND
+from snapshot_cache import RESOURCES, SnapshotCache
+
+
+DEFAULT_REFRESH_SECONDS = 30
+
+# /health turns 503 once no refresh succeeded for this many intervals
+STALE_REFRESH_INTERVALS = 5
+
+CODEC_JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'heatmap_codec.js')
+
+
+class SnapshotRefresher:
+    def __init__(self, cache: SnapshotCache, pairs: List[Tuple[str, str]],
+                 interval: float = DEFAULT_REFRESH_SECONDS, alert_engine: AlertEngine = None):
+        """
+        Background thread recomputing each pair's heatmap into the cache and
+        feeding the new clusters and price to the alert engine, if any.
+        """
+        self.cache = cache
+        self.pairs = pairs
+        self.interval = interval
+        self.alert_engine = alert_engine
+        self._fetchers: Dict[str, LiquidationDataFetcher] = {}
+        self.started_at = None
+        self.last_success = None
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread.start()
+
+    def refresh_once(self) -> None:
+        # A failing pair (bad exchange name, exchange error, alert delivery)
+        # must not end the thread, or the API would serve stale data forever
+        for exchange, symbol in self.pairs:
+            try:
+                self._refresh_pair(exchange, symbol)
+            except Exception as e:
+                print(f"Error refreshing {exchange} {symbol}: {e}")
+
+    def _refresh_pair(self, exchange: str, symbol: str) -> None:
+        fetcher = self._fetchers.get(exchange)
+        if fetcher is None:
+            fetcher = LiquidationDataFetcher(exchange, priority=BACKGROUND, tiered_depth=True)
+            self._fetchers[exchange] = fetcher
+        data = fetcher.get_liquidation_heatmap_data(symbol)
+        if not data:
+            return
+        self.cache.put(exchange, symbol, data)
+        self.last_success = time.time()
+        if self.alert_engine is not None:
+            try:
+                self.alert_engine.update_heatmap(exchange, symbol, data)
+                self.alert_engine.on_tick(exchange, symbol, data['current_price'])
+            except Exception as e:
+                print(f"Error evaluating alerts for {exchange} {symbol}: {e}")
+
+    def last_success_age(self) -> float:
+        """Seconds since a snapshot was last refreshed, or None if none was yet."""
+        return None if self.last_success is None else time.time() - self.last_success
+
+    def is_stale(self) -> bool:
+        """No refresh succeeded for STALE_REFRESH_INTERVALS intervals (counted from start)."""
+        reference = self.last_success or self.started_at
+        return reference is not None and time.time() - reference > self.interval * STALE_REFRESH_INTERVALS
+
+    def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            self.refresh_once()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class HeatmapAPI:
+    def __init__(self, cache: SnapshotCache = None, refresher: SnapshotRefresher = None):
+        """WSGI application serving pre-serialized snapshots from the cache."""
+        self.cache = cache or SnapshotCache()
+        self.refresher = refresher
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Started on the first request so the thread lives in the serving
+        # process even when gunicorn forks workers after import
+        if self.refresher is None or self._started:
+            return
+        with self._start_lock:
+            if not self._started:
+                self.refresher.start()
+                self._started = True
+
+    def __call__(self, environ, start_response):
+        self._ensure_started()
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            return self._json(start_response, '405 Method Not Allowed', {'error': 'method not allowed'},
+                              [('Allow', 'GET, HEAD')])
+
+        parts = [part for part in environ.get('PATH_INFO', '/').split('/') if part]
+        if parts == ['health']:
+            stale = self.refresher is not None and self.refresher.is_stale()
+            age = self.refresher.last_success_age() if self.refresher is not None else None
+            return self._json(start_response, '503 Service Unavailable' if stale else '200 OK', {
+                'status': 'stale' if stale else 'ok',
+                'snapshots': len(self.cache.snapshots()),
+                'last_refresh_age_seconds': None if age is None else round(age, 1)
+            })
+        if parts == ['v1', 'snapshots']:
+            return self._json(start_response, '200 OK', [
+                {
+                    'exchange': snapshot.exchange,
+                    'symbol': snapshot.symbol,
+                    'version': snapshot.version,
+                    'last_modified': formatdate(snapshot.last_modified, usegmt=True)
+                }
+                for snapshot in self.cache.snapshots()
+            ])
+        if parts == ['v1', 'heatmap_codec.js']:
+            with open(CODEC_JS_PATH, 'rb') as f:
+                body = f.read()
+            start_response('200 OK', [('Content-Type', 'application/javascript'),
+                                      ('Content-Length', str(len(body))),
+                                      ('Cache-Control', 'max-age=3600')])
+            return [body]
+        if len(parts) == 4 and parts[0] == 'v1' and parts[3] == 'heatmap.bin':
+            return self._binary(environ, start_response, parts[1], parts[2].replace('-', '/'))
+        if len(parts) == 4 and parts[0] == 'v1' and parts[3] in RESOURCES:
+            return self._snapshot(environ, start_response, parts[1], parts[2].replace('-', '/'), parts[3])
+        return self._json(start_response, '404 Not Found', {'error': 'not found'})
+
+    def _snapshot(self, environ, start_response, exchange: str, symbol: str, resource: str):
+        snapshot = self.cache.get(exchange, symbol)
+        if snapshot is None:
+            return self._json(start_response, '404 Not Found',
+                              {'error': f'no snapshot for {exchange} {symbol}'})
+
+        encoding = 'gzip' if 'gzip' in environ.get('HTTP_ACCEPT_ENCODING', '') else 'identity'
+        etag = snapshot.etag(encoding)
+        headers = [
+            ('Content-Type', 'application/json'),
+            ('ETag', etag),
+            ('Last-Modified', formatdate(snapshot.last_modified, usegmt=True)),
+            ('Cache-Control', 'no-cache'),
+            ('Vary', 'Accept-Encoding')
+        ]
+
+        if self._not_modified(environ, snapshot, etag):
+            start_response('304 Not Modified', headers)
+            return []
+
+        body = snapshot.bodies[resource][encoding]
+        if encoding == 'gzip':
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(body))))
+        start_response('200 OK', headers)
+        return [] if environ.get('REQUEST_METHOD') == 'HEAD' else [body]
+
+    def _binary(self, environ, start_response, exchange: str, symbol: str):
+        """
+        Serve the heatmap as a binary frame. A client passing the version it
+        already holds as `since` receives only the delta to the latest one.
+        """
+        snapshot = self.cache.get(exchange, symbol)
+        if snapshot is None or snapshot.binary['keyframe'] is None:
+            return self._json(start_response, '404 Not Found',
+                              {'error': f'no snapshot for {exchange} {symbol}'})
+
+        since = parse_qs(environ.get('QUERY_STRING', '')).get('since', [None])[0]
+        binary = snapshot.binary
+        if since is not None and since.isdigit() and int(since) == binary['base'] and binary['delta']:
+            body, kind = binary['delta'], f"delta-{binary['base']}"
+        else:
+            body, kind = binary['keyframe'], 'key'
+        etag = f'"{snapshot.exchange}:{snapshot.symbol}:{snapshot.version}-{kind}"'
+        headers = [
+            ('Content-Type', 'application/octet-stream'),
+            ('ETag', etag),
+            ('Last-Modified', formatdate(snapshot.last_modified, usegmt=True)),
+            ('Cache-Control', 'no-cache'),
+            ('X-Heatmap-Version', str(snapshot.version))
+        ]
+
+        up_to_date = since is not None and since.isdigit() and int(since) == snapshot.version
+        if up_to_date or self._not_modified(environ, snapshot, etag):
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.append(('Content-Length', str(len(body))))
+        start_response('200 OK', headers)
+        return [] if environ.get('REQUEST_METHOD') == 'HEAD' else [body]
+
+    def _not_modified(self, environ, snapshot, etag: str) -> bool:
+        """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)."""
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags)
+
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(snapshot.last_modified) <= since
+        return False
+
+    def _json(self, start_response, status: str, payload, extra_headers: List = None):
+        body = json.dumps(payload).encode()
+        headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))]
+        start_response(status, headers + (extra_headers or []))
+        return [body]
+
+
+def create_app() -> HeatmapAPI:
+    """Build the API with a refresher configured from the environment."""
+    cache = SnapshotCache()
+    alert_engine = None
+    if os.environ.get('LIQ_ALERT_RULES'):
+        sinks = [LogSink()]
+        if os.environ.get('LIQ_ALERT_WEBHOOK'):
+            sinks.append(WebhookSink(os.environ['LIQ_ALERT_WEBHOOK']))
+        alert_engine = AlertEngine.from_file(os.environ['LIQ_ALERT_RULES'], sinks)
+    refresher = SnapshotRefresher(
+        cache,
+        parse_pairs(os.environ.get('LIQ_API_PAIRS', DEFAULT_PAIRS)),
+        float(os.environ.get('LIQ_API_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)),
+        alert_engine
+    )
+    return HeatmapAPI(cache, refresher)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    from wsgiref.simple_server import make_server
+
+    port = int(os.environ.get('PORT', 8000))
+    print(f"Serving heatmap API on http://0.0.0.0:{port}")
+    make_server('0.0.0.0', port, app).serve_forever()
@@ -0,0 +1,260 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from leverage_engine import get_level_engine
+
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def timestamps_ms(values: pd.Series) -> np.ndarray:
+    """Timestamp column as epoch milliseconds: numeric (ccxt ms) or any datetime pandas parses."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    parsed = pd.to_datetime(values, utc=True)
+    return parsed.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+
+def _column_name(name) -> str:
+    return str(name).strip().lower()
+
+
+def _rolling(values: np.ndarray, window: int, how: str) -> np.ndarray:
+    """Trailing rolling min/max in O(n); the first window-1 entries are NaN."""
+    rolling = pd.Series(values).rolling(window)
+    return (rolling.min() if how == 'min' else rolling.max()).to_numpy()
+
+
+class BacktestStats:
+    def __init__(self, leverage_levels: List[int]):
+        """Running cluster-hit counters, merged across chunks."""
+        self.leverage_levels = list(leverage_levels)
+        self.steps = 0
+        self.candles = 0
+        self.long_hits = np.zeros(len(self.leverage_levels), dtype=np.int64)
+        self.short_hits = np.zeros(len(self.leverage_levels), dtype=np.int64)
+        self.long_wicks_near = 0
+        self.short_wicks_near = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def summary(self) -> Dict:
+        steps = max(self.steps, 1)
+        return {
+            'candles': self.candles,
+            'steps': self.steps,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'levels': [
+                {
+                    'leverage': leverage,
+                    'long_hit_rate': self.long_hits[i] / steps,
+                    'short_hit_rate': self.short_hits[i] / steps
+                }
+                for i, leverage in enumerate(self.leverage_levels)
+            ],
+            'long_wick_near_cluster_rate': self.long_wicks_near / steps,
+            'short_wick_near_cluster_rate': self.short_wicks_near / steps
+        }
+
+
+class LiquidationBacktester:
+    def __init__(self, lookback: int = 1440, horizon: int = 240, step: int = 1,
+                 chunk_size: int = 250_000, tolerance_pct: float = 0.25,
+                 leverage_levels: List[int] = None, maintenance_brackets: List = None):
+        """
+        Replay an OHLCV history and score the liquidation map against what
+        price did next.
+
+        At every `step`-th candle the levels are rebuilt as the historical
+        analysis would: from that candle's close and the low/high of the
+        previous `lookback` candles. A level counts as hit when the low (long)
+        or high (short) of the next `horizon` candles reaches it; a wick is
+        near a cluster when that extreme ends within `tolerance_pct` of any
+        level. Files are streamed in `chunk_size` rows with a carry of
+        lookback + horizon rows between chunks, so memory does not grow with
+        history length.
+        """
+        self.lookback = lookback
+        self.horizon = horizon
+        self.step = step
+        self.chunk_size = chunk_size
+        self.tolerance = tolerance_pct / 100
+        self.engine = get_level_engine(leverage_levels, maintenance_brackets)
+        self.leverage_levels = self.engine.leverage_levels
+
+    def read_chunks(self, path: str):
+        """
+        Yield OHLCV DataFrame chunks with timestamps in epoch ms. Headerless
+        ccxt-style CSVs are accepted too; a header is recognized by the OHLCV
+        column names, in any case (`Timestamp,Open,...` works).
+        """
+        first = pd.read_csv(path, nrows=1, header=None, dtype=str, compression='infer').iloc[0]
+        first = {_column_name(name) for name in first}
+        has_header = bool(first & set(OHLCV_COLUMNS))
+        reader = pd.read_csv(
+            path,
+            header=0 if has_header else None,
+            names=None if has_header else OHLCV_COLUMNS,
+            usecols=lambda name: _column_name(name) in OHLCV_COLUMNS,
+            chunksize=self.chunk_size,
+            compression='infer'
+        )
+        for chunk in reader:
+            chunk = chunk.rename(columns=_column_name)
+            chunk['timestamp'] = timestamps_ms(chunk['timestamp'])
+            yield chunk
+
+    def run_file(self, path: str) -> Dict:
+        stats = BacktestStats(self.leverage_levels)
+        carry = None
+        # Global index of the first row in the carried-over buffer
+        offset = 0
+        for chunk in self.read_chunks(path):
+            frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+            self.score_chunk(frame, offset, stats)
+            # Keep what the next chunk needs: the lookback window of its first
+            # unscored row, plus the rows whose horizon was not complete yet
+            keep = self.lookback - 1 + self.horizon
+            if len(frame) > keep:
+                offset += len(frame) - keep
+                carry = frame.iloc[len(frame) - keep:].reset_index(drop=True)
+            else:
+                carry = frame
+            stats.candles += len(chunk)
+        return stats.summary()
+
+    def score_chunk(self, frame: pd.DataFrame, offset: int, stats: BacktestStats) -> None:
+        """Score every scorable row of a buffer; each global row is scored exactly once."""
+        n = len(frame)
+        first = self.lookback - 1
+        last = n - self.horizon  # exclusive
+        if last <= first:
+            return
+
+        low = frame['low'].to_numpy(dtype=np.float64)
+        high = frame['high'].to_numpy(dtype=np.float64)
+        close = frame['close'].to_numpy(dtype=np.float64)
+
+        rows = np.arange(first, last)
+        rows = rows[(rows + offset) % self.step == 0]
+        if len(rows) == 0:
+            return
+
+        past_min = _rolling(low, self.lookback, 'min')[rows]
+        past_max = _rolling(high, self.lookback, 'max')[rows]
+        # min/max over rows i+1 .. i+horizon, read off the trailing window ending at i+horizon
+        future_min = _rolling(low, self.horizon, 'min')[rows + self.horizon]
+        future_max = _rolling(high, self.horizon, 'max')[rows + self.horizon]
+
+        long_prices, short_prices = self.engine.level_prices(close[rows], past_min, past_max)
+        stats.long_hits += (future_min[:, None] <= long_prices).sum(axis=0)
+        stats.short_hits += (future_max[:, None] >= short_prices).sum(axis=0)
+
+        long_gap = np.abs(long_prices - future_min[:, None]).min(axis=1) / future_min
+        short_gap = np.abs(short_prices - future_max[:, None]).min(axis=1) / future_max
+        stats.long_wicks_near += int((long_gap <= self.tolerance).sum())
+        stats.short_wicks_near += int((short_gap <= self.tolerance).sum())
+
+        stats.steps += len(rows)
+        timestamps = frame['timestamp'].to_numpy()
+        if stats.first_timestamp is None:
+            stats.first_timestamp = int(timestamps[rows[0]])
+        stats.last_timestamp = int(timestamps[rows[-1]])
+
+
+def _run_symbol(path: str, settings: Dict) -> Dict:
+    """Process pool entry point for one symbol's file."""
+    started = time.monotonic()
+    summary = LiquidationBacktester(**settings).run_file(path)
+    summary['symbol'] = os.path.basename(path).split('.')[0]
+    summary['seconds'] = time.monotonic() - started
+    return summary
+
+
+def run_backtests(paths: List[str], workers: int = None, **settings) -> List[Dict]:
+    """Backtest several symbol files in parallel, one process per file at a time."""
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_run_symbol, path, settings): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error backtesting {futures[future]}: {e}")
+    return sorted(results, key=lambda result: result['symbol'])
+
+
+def print_summary(result: Dict) -> None:
+    rate = result['candles'] / max(result['seconds'], 1e-9) * 60
+    print(f"\n📈 {result['symbol']}: {result['candles']:,} candles, {result['steps']:,} steps "
+          f"({result['seconds']:.1f}s, {rate:,.0f} candles/min)")
+    print(f"  Wick ended near a long cluster:  {result['long_wick_near_cluster_rate']:.1%}")
+    print(f"  Wick ended near a short cluster: {result['short_wick_near_cluster_rate']:.1%}")
+    print("  Leverage   Long hit   Short hit")
+    for level in result['levels']:
+        print(f"  {level['leverage']:>7}x   {level['long_hit_rate']:>7.1%}   {level['short_hit_rate']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest liquidation levels against later highs and lows')
+    parser.add_argument('files', nargs='+',
+                       help='OHLCV CSV files, one per symbol (timestamp,open,high,low,close,volume)')
+    parser.add_argument('--lookback', type=int, default=1440,
+                       help='Candles the levels are built from (default: 1440)')
+    parser.add_argument('--horizon', type=int, default=240,
+                       help='Candles ahead a level must be hit within (default: 240)')
+    parser.add_argument('--step', type=int, default=1,
+                       help='Rebuild the levels every N candles (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=250_000,
+                       help='Rows read per chunk (default: 250000)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                       help='Percent distance counted as a wick reaching a cluster (default: 0.25)')
+    parser.add_argument('--leverage', type=int, nargs='+', default=None,
+                       help='Leverage levels (default: 5 10 25 50 100 125)')
+    parser.add_argument('--brackets', type=str, default=None,
+                       help='JSON file of maintenance-margin brackets (ccxt leverage tiers)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes (default: one per file, up to the CPU count)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Write the results as JSON to this path')
+
+    args = parser.parse_args()
+
+    maintenance_brackets = None
+    if args.brackets:
+        with open(args.brackets) as f:
+            maintenance_brackets = json.load(f)
+
+    print(f"Backtesting {len(args.files)} file(s)...")
+    results = run_backtests(
+        args.files,
+        workers=args.workers,
+        lookback=args.lookback,
+        horizon=args.horizon,
+        step=args.step,
+        chunk_size=args.chunk_size,
+        tolerance_pct=args.tolerance,
+        leverage_levels=args.leverage,
+        maintenance_brackets=maintenance_brackets
+    )
+    for result in results:
+        print_summary(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=float)
+        print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
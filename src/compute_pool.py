@@ -0,0 +1,245 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher import LiquidationDataFetcher
+from memory_budget import get_tracker, measure
+
+
+REALTIME = 'real-time'
+HISTORICAL = 'historical'
+
+
+# Worker process side
+
+_worker_fetchers: Dict[Tuple, LiquidationDataFetcher] = {}
+
+
+def _worker_fetcher(exchange: str, leverage_levels: Tuple, maintenance_brackets: Tuple) -> LiquidationDataFetcher:
+    """Compute-only fetcher per worker process and level setup; it never issues network calls."""
+    key = (exchange, leverage_levels, maintenance_brackets)
+    fetcher = _worker_fetchers.get(key)
+    if fetcher is None:
+        fetcher = LiquidationDataFetcher(exchange, leverage_levels=leverage_levels,
+                                         maintenance_brackets=maintenance_brackets)
+        _worker_fetchers[key] = fetcher
+    return fetcher
+
+
+def _export_frame(df: pd.DataFrame) -> Dict:
+    """
+    Copy a DataFrame's columns into one shared memory block and return its
+    layout, so the result crosses the process boundary without pickling.
+    """
+    arrays = []
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype('datetime64[ns]')
+        arrays.append((name, np.ascontiguousarray(values)))
+
+    size = max(1, sum(values.nbytes for _, values in arrays))
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    # The parent unlinks the block; stop this process's tracker from doing it on exit
+    resource_tracker.unregister(shm._name, 'shared_memory')
+
+    layout = []
+    offset = 0
+    for name, values in arrays:
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=offset)
+        target[...] = values
+        layout.append((name, values.dtype.str, len(values), offset))
+        offset += values.nbytes
+    del target
+    shm.close()
+    return {'shm': shm.name, 'layout': layout}
+
+
+def _compute_heatmap(exchange: str, leverage_levels: Tuple, maintenance_brackets: Tuple, symbol: str,
+                     mode: str, timeframe: str, duration_minutes: int, inputs: Dict) -> Tuple[Dict, Dict]:
+    """
+    Worker entry point: build the heatmap data and export it to shared
+    memory. Returns the data and the memory used building it, measured here
+    where the allocations happen.
+    """
+    fetcher = _worker_fetcher(exchange, leverage_levels, maintenance_brackets)
+    with measure(get_tracker().trace_allocations) as usage:
+        if mode == HISTORICAL:
+            data = fetcher.build_historical_data(symbol, timeframe, duration_minutes, **inputs)
+        else:
+            data = fetcher.build_realtime_data(symbol, **inputs)
+    data['heatmap_data'] = _export_frame(data['heatmap_data'])
+    return data, usage
+
+
+# Parent process side
+
+def _import_frame(exported: Dict) -> pd.DataFrame:
+    """Rebuild a DataFrame from shared memory and release the block."""
+    shm = shared_memory.SharedMemory(name=exported['shm'])
+    try:
+        columns = {}
+        for name, dtype, length, offset in exported['layout']:
+            view = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            columns[name] = view.copy()
+            del view
+        return pd.DataFrame(columns)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _discard_frame(exported: Dict) -> None:
+    try:
+        shm = shared_memory.SharedMemory(name=exported['shm'])
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class _InFlight:
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 0
+        self.cancelled = False
+
+
+class HeatmapComputePool:
+    def __init__(self, max_workers: int = 2, fetch_workers: int = 8, timeout: float = 120.0):
+        """
+        Shared pool that takes heatmap computation off the Streamlit script
+        threads.
+
+        Market data is fetched on I/O threads in this process (through the
+        request scheduler); the CPU-heavy heatmap computation runs in worker
+        processes. Identical requests in flight share one computation, and a
+        computation nobody waits for any more is cancelled.
+        """
+        self.timeout = timeout
+        self._processes = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self._io = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='heatmap-fetch')
+        self._in_flight: Dict[Tuple, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'deduplicated': 0, 'cancelled': 0, 'timeouts': 0}
+
+    def compute(self, fetcher: LiquidationDataFetcher, symbol: str, mode: str = REALTIME,
+                timeframe: str = None, duration_minutes: int = 0,
+                on_wait: Callable[[float], None] = None, timeout: float = None) -> Dict:
+        """
+        Return heatmap data for the request, joining an identical one already
+        in flight. `on_wait(elapsed)` is called while waiting; any exception it
+        raises (e.g. Streamlit stopping the script when the viewer leaves)
+        abandons the wait and cancels the work if no one else needs it.
+        Raises TimeoutError after `timeout` seconds.
+        """
+        key = (fetcher.exchange_name, fetcher.leverage_levels, fetcher.brackets_for(symbol),
+               symbol, mode, timeframe, duration_minutes)
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._lock:
+            self._stats['requests'] += 1
+            entry = self._in_flight.get(key)
+            if entry is None:
+                entry = _InFlight()
+                self._in_flight[key] = entry
+                self._io.submit(self._run, key, entry, fetcher, symbol, mode, timeframe, duration_minutes)
+            else:
+                self._stats['deduplicated'] += 1
+            entry.waiters += 1
+
+        started = time.monotonic()
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise TimeoutError(f"Heatmap computation for {symbol} timed out after {timeout:.0f}s")
+                try:
+                    return entry.future.result(timeout=min(0.5, remaining))
+                except TimeoutError:
+                    if on_wait is not None:
+                        on_wait(time.monotonic() - started)
+        finally:
+            self._release(key, entry)
+
+    def _release(self, key: Tuple, entry: _InFlight) -> None:
+        with self._lock:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.future.done():
+                entry.cancelled = True
+                self._stats['cancelled'] += 1
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+
+    def _run(self, key: Tuple, entry: _InFlight, fetcher: LiquidationDataFetcher, symbol: str,
+             mode: str, timeframe: str, duration_minutes: int) -> None:
+        try:
+            if mode == HISTORICAL:
+                inputs = fetcher.fetch_historical_inputs(symbol, duration_minutes)
+                if inputs is None:
+                    print("⚠️ No historical data available, using current snapshot")
+                    mode = REALTIME
+            if mode == REALTIME:
+                inputs = fetcher.fetch_realtime_inputs(symbol)
+
+            if inputs is None or entry.cancelled:
+                entry.future.set_result(None)
+                return
+
+            task = self._processes.submit(_compute_heatmap, fetcher.exchange_name, fetcher.leverage_levels,
+                                          fetcher.brackets_for(symbol), symbol, mode, timeframe,
+                                          duration_minutes, inputs)
+            while True:
+                try:
+                    data, usage = task.result(timeout=0.5)
+                    break
+                except TimeoutError:
+                    if entry.cancelled and task.cancel():
+                        entry.future.set_result(None)
+                        return
+
+            get_tracker().record_stage('compute', **usage)
+            if entry.cancelled:
+                _discard_frame(data['heatmap_data'])
+                entry.future.set_result(None)
+                return
+            data['heatmap_data'] = _import_frame(data['heatmap_data'])
+            entry.future.set_result(data)
+        except Exception as e:
+            entry.future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._in_flight))
+
+    def shutdown(self) -> None:
+        self._io.shutdown(wait=False, cancel_futures=True)
+        self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_compute_pool() -> HeatmapComputePool:
+    """Process-wide pool, shared by the app's sessions and the warm-up loop."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HeatmapComputePool()
+        return _pool
@@ -2,33 +2,146 @@ import ccxt
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
+import threading
 import time
 from datetime import datetime, timedelta
+from request_scheduler import RequestScheduler, get_scheduler, INTERACTIVE
+from tiered_order_book import DEFAULT_DEPTH_TIERS, get_tiered_book
+from leverage_engine import (DEFAULT_LEVERAGE_LEVELS, get_level_engine, level_multipliers,
+                             normalize_brackets, side_arrays)
+from warm_store import WarmStore
+
+
+# Candle intervals available for historical analysis, finest first (minutes)
+OHLCV_TIMEFRAMES = [
+    ('1m', 1),
+    ('5m', 5),
+    ('15m', 15),
+    ('1h', 60),
+    ('4h', 240),
+    ('1d', 1440),
+]
+
+# Analysis periods offered for historical analysis (label, key, minutes)
+HISTORICAL_PERIODS = [
+    ("12 Hours", "12h", 720),
+    ("24 Hours", "1d", 1440),
+    ("2 Days", "2d", 2880),
+    ("3 Days", "3d", 4320),
+    ("1 Week", "1w", 10080),
+    ("2 Weeks", "2w", 20160),
+    ("1 Month", "1M", 43200),
+    ("3 Months", "3M", 129600),
+]
+
+# Exchange markets are loaded once per process and shared by every fetcher
+MARKETS_TTL_SECONDS = 3600
+_markets: Dict[str, Tuple[Dict, float]] = {}
+_markets_lock = threading.Lock()
 
 
 class LiquidationDataFetcher:
-    def __init__(self, exchange_name: str = 'binance'):
+    def __init__(self, exchange_name: str = 'binance', max_candles: int = 5000,
+                 page_limit: int = 1000, display_time_points: int = 50,
+                 scheduler: RequestScheduler = None, priority: int = INTERACTIVE,
+                 tiered_depth: bool = False, depth_tiers: Dict[str, List[Dict]] = None,
+                 leverage_levels: List[float] = None, maintenance_brackets=None,
+                 warm_store: WarmStore = None):
         """Initialize the data fetcher with specified exchange."""
+        self.exchange_name = exchange_name
         self.exchange = getattr(ccxt, exchange_name)({
             'enableRateLimit': True,
             'options': {
                 'defaultType': 'future'  # Use futures market for liquidation data
             }
         })
+        # Historical fetch budget: total candles per analysis and per request
+        self.max_candles = max_candles
+        self.page_limit = page_limit
+        self.display_time_points = display_time_points
+        # All exchange calls go through the shared weight-aware scheduler
+        # (resolved lazily so compute-only instances never start it)
+        self.scheduler = scheduler
+        self.priority = priority
+        # Tiered depth: shallow book refreshed often, deep book rarely;
+        # `depth_tiers` maps symbols to their own tier list
+        self.tiered_depth = tiered_depth
+        self.depth_tiers = depth_tiers or {}
+        # Leverage grid and maintenance-margin brackets the levels are computed
+        # for; brackets are one table for every symbol or {symbol: table}
+        self.leverage_levels = tuple(leverage_levels or DEFAULT_LEVERAGE_LEVELS)
+        if isinstance(maintenance_brackets, dict):
+            self.symbol_brackets = {symbol: normalize_brackets(brackets)
+                                    for symbol, brackets in maintenance_brackets.items()}
+            self.maintenance_brackets = ()
+        else:
+            self.symbol_brackets = {}
+            self.maintenance_brackets = normalize_brackets(maintenance_brackets)
+        self.level_engine = get_level_engine(self.leverage_levels, self.maintenance_brackets)
+        # Saved markets and candles to start from instead of refetching them
+        self.warm_store = warm_store
+        
+    def _submit(self, endpoint: str, symbol: str, *args, limit: int = None, **kwargs):
+        """Queue an exchange call on the scheduler and return its Future."""
+        if not self.exchange.markets:
+            self.load_markets()
+        method = getattr(self.exchange, endpoint)
+        if limit is not None:
+            kwargs['limit'] = limit
+        scheduler = self.scheduler or get_scheduler()
+        return scheduler.submit(
+            self.exchange_name, endpoint, lambda: method(*args, **kwargs),
+            symbol=symbol, priority=self.priority, limit=limit
+        )
+    
+    def load_markets(self) -> None:
+        """
+        Give the exchange its markets without loading them per fetcher: from
+        the process-wide copy, else the warm snapshot, else the exchange.
+        """
+        with _markets_lock:
+            cached = _markets.get(self.exchange_name)
+            if cached is None or time.time() - cached[1] > MARKETS_TTL_SECONDS:
+                markets = None
+                if self.warm_store is not None:
+                    markets = self.warm_store.load_markets(self.exchange_name, MARKETS_TTL_SECONDS)
+                if markets is None:
+                    scheduler = self.scheduler or get_scheduler()
+                    markets = scheduler.call(self.exchange_name, 'load_markets', self.exchange.load_markets,
+                                             priority=self.priority)
+                    if self.warm_store is not None:
+                        self.warm_store.save_markets(self.exchange_name, markets)
+                cached = (markets, time.time())
+                _markets[self.exchange_name] = cached
+        self.exchange.set_markets(cached[0])
+    
+    def _call(self, endpoint: str, symbol: str, *args, limit: int = None, **kwargs):
+        """Run an exchange call through the scheduler and wait for it."""
+        return self._submit(endpoint, symbol, *args, limit=limit, **kwargs).result()
         
     def fetch_order_book(self, symbol: str, limit: int = 1000) -> Dict:
         """Fetch order book data for a given symbol."""
         try:
-            order_book = self.exchange.fetch_order_book(symbol, limit)
+            order_book = self._call('fetch_order_book', symbol, symbol, limit=limit)
             return order_book
         except Exception as e:
             print(f"Error fetching order book: {e}")
             return None
     
+    def fetch_tiered_order_book(self, symbol: str) -> Dict:
+        """
+        Fetch a merged order book from depth tiers, refreshing only the tiers
+        that are due. Per-tier staleness is reported under 'tiers'.
+        """
+        tiers = self.depth_tiers.get(symbol, DEFAULT_DEPTH_TIERS)
+        book = get_tiered_book(self.exchange_name, symbol, tiers)
+        book.refresh(lambda limit: self.fetch_order_book(symbol, limit))
+        return book.snapshot()
+    
     def fetch_ticker(self, symbol: str) -> Dict:
         """Fetch current ticker data including price."""
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
+            ticker = self._call('fetch_ticker', symbol, symbol)
             return ticker
         except Exception as e:
             print(f"Error fetching ticker: {e}")
@@ -37,7 +150,7 @@ class LiquidationDataFetcher:
     def fetch_ohlcv(self, symbol: str, timeframe: str = '1h', limit: int = 500) -> pd.DataFrame:
         """Fetch OHLCV data for volatility calculation."""
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            ohlcv = self._call('fetch_ohlcv', symbol, symbol, timeframe, limit=limit)
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
             return df
@@ -45,41 +158,167 @@ class LiquidationDataFetcher:
             print(f"Error fetching OHLCV: {e}")
             return None
     
-    def calculate_liquidation_levels(self, current_price: float, leverage_levels: List[int] = None) -> Dict[str, List[float]]:
+    def ohlcv_page_limit(self, symbol: str) -> int:
         """
-        Calculate potential liquidation price levels based on leverage.
+        Candles per OHLCV request: `page_limit`, capped at the exchange's
+        own limit for the symbol's market type (e.g. 300 on OKX).
+        """
+        features = getattr(self.exchange, 'features', None) or {}
+        market_type = self.exchange.options.get('defaultType', 'spot')
+        sub_type = 'linear'
+        try:
+            if not self.exchange.markets:
+                self.load_markets()
+            market = self.exchange.market(symbol)
+            market_type = market.get('type') or market_type
+            sub_type = 'inverse' if market.get('inverse') else 'linear'
+        except Exception:
+            pass
+        feature = features.get(market_type) or {}
+        feature = feature.get(sub_type) or feature
+        exchange_limit = (feature.get('fetchOHLCV') or {}).get('limit')
+        return min(self.page_limit, int(exchange_limit)) if exchange_limit else self.page_limit
+    
+    def select_ohlcv_timeframe(self, duration_minutes: int) -> Tuple[str, int]:
+        """
+        Pick the finest candle interval whose candle count for the period fits
+        within the fetch budget. Returns (timeframe, interval_minutes).
+        """
+        supported = getattr(self.exchange, 'timeframes', None) or {}
+        for timeframe, minutes in OHLCV_TIMEFRAMES:
+            if supported and timeframe not in supported:
+                continue
+            if duration_minutes / minutes <= self.max_candles:
+                return timeframe, minutes
+        return OHLCV_TIMEFRAMES[-1]
+    
+    def fetch_ohlcv_range(self, symbol: str, timeframe: str, since: int, until: int = None) -> pd.DataFrame:
+        """
+        Fetch OHLCV data between `since` and `until` (ms timestamps) as
+        paginated windows requested concurrently, then stitch the pages and
+        drop duplicate candles at page boundaries.
+        """
+        if until is None:
+            until = self.exchange.milliseconds()
+        
+        interval_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        limit = self.ohlcv_page_limit(symbol)
+        page_ms = interval_ms * limit
+        windows = list(range(since, until, page_ms))
+        if not windows:
+            return None
+        
+        # Pages are queued together; the scheduler keeps them within the
+        # exchange's weight budget
+        pending = [
+            (start, min(start + page_ms, until),
+             self._submit('fetch_ohlcv', symbol, symbol, timeframe, since=start, limit=limit))
+            for start in windows
+        ]
+        rows = []
+        while pending:
+            start, end, future = pending.pop(0)
+            try:
+                page = future.result()
+            except Exception as e:
+                print(f"Error fetching OHLCV page at {start}: {e}")
+                continue
+            rows.extend(page)
+            # Some exchanges return fewer candles than asked (e.g. a lower cap
+            # for older history), so keep paging until the window is covered
+            if page:
+                next_start = int(page[-1][0]) + interval_ms
+                if start < next_start < end:
+                    pending.append((next_start, end, self._submit(
+                        'fetch_ohlcv', symbol, symbol, timeframe, since=next_start, limit=limit)))
+        
+        if not rows:
+            return None
         
-        For longs: Liquidation Price = Entry Price * (1 - 1/Leverage)
-        For shorts: Liquidation Price = Entry Price * (1 + 1/Leverage)
+        df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df = df[(df['timestamp'] >= since) & (df['timestamp'] < until)]
+        df = df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df.reset_index(drop=True)
+    
+    def fetch_candles(self, symbol: str, timeframe: str, since: int, until: int) -> pd.DataFrame:
+        """
+        `fetch_ohlcv_range` on top of the warm store's saved candles: only
+        the candles after the last saved one (which may have been still open)
+        are fetched, and the latest `max_candles` are saved back.
         """
-        if leverage_levels is None:
-            leverage_levels = [5, 10, 25, 50, 100, 125]
+        if self.warm_store is None:
+            return self.fetch_ohlcv_range(symbol, timeframe, since, until)
+        
+        saved = self.warm_store.load_candles(self.exchange_name, symbol, timeframe)
+        fetch_since = since
+        if saved is not None and not saved.empty:
+            saved_ms = saved['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+            if saved_ms[0] <= since <= saved_ms[-1]:
+                fetch_since = int(saved_ms[-1])
+            else:
+                saved = None
+        
+        fresh = self.fetch_ohlcv_range(symbol, timeframe, fetch_since, until)
+        if saved is None:
+            ohlcv = fresh
+        elif fresh is None or fresh.empty:
+            ohlcv = saved
+        else:
+            ohlcv = pd.concat([saved, fresh]).drop_duplicates(subset='timestamp', keep='last')
+            ohlcv = ohlcv.sort_values('timestamp').reset_index(drop=True)
+        if ohlcv is None or ohlcv.empty:
+            return None
         
-        liquidation_levels = {
-            'long_liquidations': [],
-            'short_liquidations': []
-        }
+        if fresh is not None and not fresh.empty:
+            try:
+                self.warm_store.save_candles(self.exchange_name, symbol, timeframe, ohlcv.iloc[-self.max_candles:])
+            except OSError as e:
+                print(f"Error saving candles for {symbol}: {e}")
         
-        for leverage in leverage_levels:
-            # Long liquidation (price goes down)
-            long_liq_price = current_price * (1 - 1/leverage)
-            liquidation_levels['long_liquidations'].append({
-                'leverage': leverage,
-                'price': long_liq_price,
-                'distance_percent': ((current_price - long_liq_price) / current_price) * 100,
-                'risk_level': 'high' if leverage >= 50 else 'medium' if leverage >= 25 else 'low'
-            })
-            
-            # Short liquidation (price goes up)
-            short_liq_price = current_price * (1 + 1/leverage)
-            liquidation_levels['short_liquidations'].append({
-                'leverage': leverage,
-                'price': short_liq_price,
-                'distance_percent': ((short_liq_price - current_price) / current_price) * 100,
-                'risk_level': 'high' if leverage >= 50 else 'medium' if leverage >= 25 else 'low'
-            })
-        
-        return liquidation_levels
+        since_ts = pd.to_datetime(since, unit='ms')
+        return ohlcv[ohlcv['timestamp'] >= since_ts].reset_index(drop=True)
+    
+    def downsample_ohlcv(self, ohlcv: pd.DataFrame, time_points: int = None) -> pd.DataFrame:
+        """
+        Aggregate candles into at most `time_points` equal-sized buckets so
+        heatmap cost depends on the display resolution, not the candle count.
+        """
+        if time_points is None:
+            time_points = self.display_time_points
+        if ohlcv is None or len(ohlcv) <= time_points:
+            return ohlcv
+        
+        buckets = np.arange(len(ohlcv)) * time_points // len(ohlcv)
+        return ohlcv.groupby(buckets).agg({
+            'timestamp': 'last',
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum'
+        }).reset_index(drop=True)
+    
+    def brackets_for(self, symbol: str = None) -> Tuple:
+        """Maintenance-margin brackets used for a symbol."""
+        return self.symbol_brackets.get(symbol, self.maintenance_brackets)
+    
+    def level_engine_for(self, symbol: str = None, leverage_levels: List[int] = None):
+        """Level engine for a symbol's brackets (and optionally another leverage grid)."""
+        brackets = self.brackets_for(symbol)
+        if leverage_levels is None and brackets == self.maintenance_brackets:
+            return self.level_engine
+        return get_level_engine(leverage_levels or self.leverage_levels, brackets)
+    
+    def calculate_liquidation_levels(self, current_price: float, leverage_levels: List[int] = None,
+                                     symbol: str = None) -> Dict[str, List[float]]:
+        """
+        Calculate potential liquidation price levels based on leverage.
+        
+        For longs: Liquidation Price = Entry Price * (1 - 1/Leverage + MMR)
+        For shorts: Liquidation Price = Entry Price * (1 + 1/Leverage - MMR)
+        """
+        return self.level_engine_for(symbol, leverage_levels).levels(current_price)
     
     def estimate_liquidation_volume(self, order_book: Dict, liquidation_levels: Dict) -> pd.DataFrame:
         """
@@ -88,76 +327,73 @@ class LiquidationDataFetcher:
         """
         bids = pd.DataFrame(order_book['bids'], columns=['price', 'volume'])
         asks = pd.DataFrame(order_book['asks'], columns=['price', 'volume'])
+        long_prices, long_leverages = side_arrays(liquidation_levels, 'long_liquidations')
+        short_prices, short_leverages = side_arrays(liquidation_levels, 'short_liquidations')
         
-        # Create price ranges for heatmap
-        all_prices = []
-        
-        # Add liquidation level prices
-        for long_liq in liquidation_levels['long_liquidations']:
-            all_prices.append(long_liq['price'])
-        for short_liq in liquidation_levels['short_liquidations']:
-            all_prices.append(short_liq['price'])
-        
-        # Add order book prices
-        all_prices.extend(bids['price'].tolist())
-        all_prices.extend(asks['price'].tolist())
-        
-        # Create price grid
-        min_price = min(all_prices) * 0.95
-        max_price = max(all_prices) * 1.05
+        # Create price grid spanning the liquidation levels and the order book
+        all_prices = np.concatenate([long_prices, short_prices, bids['price'].values, asks['price'].values])
+        min_price = all_prices.min() * 0.95
+        max_price = all_prices.max() * 1.05
         price_grid = np.linspace(min_price, max_price, 100)
         
-        # Calculate cumulative volume at each price level
-        heatmap_data = []
-        
-        for price in price_grid:
-            # Volume that would be liquidated if price reaches this level
-            long_volume = bids[bids['price'] >= price]['volume'].sum()
-            short_volume = asks[asks['price'] <= price]['volume'].sum()
-            
-            # Add leverage-based multiplier (higher leverage = more liquidations)
-            for liq_level in liquidation_levels['long_liquidations']:
-                if abs(price - liq_level['price']) < (price * 0.001):  # Within 0.1% of liquidation level
-                    long_volume *= (1 + liq_level['leverage'] / 100)
-            
-            for liq_level in liquidation_levels['short_liquidations']:
-                if abs(price - liq_level['price']) < (price * 0.001):
-                    short_volume *= (1 + liq_level['leverage'] / 100)
-            
-            heatmap_data.append({
-                'price': price,
-                'long_liquidation_volume': long_volume,
-                'short_liquidation_volume': short_volume,
-                'total_liquidation_volume': long_volume + short_volume
-            })
-        
-        return pd.DataFrame(heatmap_data)
+        # Volume that would be liquidated if price reaches each level:
+        # bids at or above it, asks at or below it
+        bids = bids.sort_values('price')
+        asks = asks.sort_values('price')
+        bids_above = np.concatenate([bids['volume'].values[::-1].cumsum()[::-1], [0.0]])
+        asks_below = np.concatenate([[0.0], asks['volume'].values.cumsum()])
+        long_volume = bids_above[np.searchsorted(bids['price'].values, price_grid, side='left')]
+        short_volume = asks_below[np.searchsorted(asks['price'].values, price_grid, side='right')]
+        
+        # Add leverage-based multiplier (higher leverage = more liquidations)
+        # within 0.1% of a liquidation level
+        long_volume = long_volume * level_multipliers(price_grid, long_prices, long_leverages, 0.001)
+        short_volume = short_volume * level_multipliers(price_grid, short_prices, short_leverages, 0.001)
+        
+        return pd.DataFrame({
+            'price': price_grid,
+            'long_liquidation_volume': long_volume,
+            'short_liquidation_volume': short_volume,
+            'total_liquidation_volume': long_volume + short_volume
+        })
     
-    def get_liquidation_heatmap_data(self, symbol: str) -> Dict:
+    def fetch_realtime_inputs(self, symbol: str) -> Dict:
         """
-        Get all necessary data for creating a liquidation heatmap.
+        Fetch the market data a real-time heatmap is computed from.
         """
         # Fetch current data
         ticker = self.fetch_ticker(symbol)
         if not ticker:
             return None
         
-        current_price = ticker['last']
-        
         # Fetch order book
-        order_book = self.fetch_order_book(symbol)
+        if self.tiered_depth:
+            order_book = self.fetch_tiered_order_book(symbol)
+        else:
+            order_book = self.fetch_order_book(symbol)
         if not order_book:
             return None
         
+        # Fetch historical data for volatility
+        ohlcv = self.fetch_ohlcv(symbol)
+        
+        return {
+            'current_price': ticker['last'],
+            'order_book': order_book,
+            'ohlcv': ohlcv
+        }
+    
+    def build_realtime_data(self, symbol: str, current_price: float, order_book: Dict,
+                            ohlcv: pd.DataFrame) -> Dict:
+        """
+        Compute a real-time heatmap from fetched inputs (no network calls).
+        """
         # Calculate liquidation levels
-        liquidation_levels = self.calculate_liquidation_levels(current_price)
+        liquidation_levels = self.calculate_liquidation_levels(current_price, symbol=symbol)
         
         # Estimate liquidation volumes
         heatmap_df = self.estimate_liquidation_volume(order_book, liquidation_levels)
         
-        # Fetch historical data for volatility
-        ohlcv = self.fetch_ohlcv(symbol)
-        
         return {
             'symbol': symbol,
             'current_price': current_price,
@@ -165,40 +401,52 @@ class LiquidationDataFetcher:
             'heatmap_data': heatmap_df,
             'ohlcv': ohlcv,
             'timestamp': datetime.now(),
-            'analysis_type': 'real-time'
+            'analysis_type': 'real-time',
+            'depth_tiers': order_book.get('tiers')
         }
     
-    def get_historical_liquidation_data(self, symbol: str, timeframe: str, duration_minutes: int) -> Dict:
+    def get_liquidation_heatmap_data(self, symbol: str) -> Dict:
         """
-        Get historical liquidation analysis over a specific timeframe.
+        Get all necessary data for creating a liquidation heatmap.
+        """
+        inputs = self.fetch_realtime_inputs(symbol)
+        if not inputs:
+            return None
+        return self.build_realtime_data(symbol, **inputs)
+    
+    def fetch_historical_inputs(self, symbol: str, duration_minutes: int) -> Dict:
+        """
+        Fetch the current price and candle history for a historical analysis.
+        Returns None when no candles are available.
         """
-        print(f"📊 Fetching historical data for {symbol} over {timeframe}...")
-        
         # Get current price first
         ticker = self.fetch_ticker(symbol)
         if not ticker:
             return None
         
-        current_price = ticker['last']
-        
-        # Map timeframes to valid exchange intervals
-        timeframe_mapping = {
-            "12h": "1h",  # Use 1h candles for 12h period
-            "1d": "1h",   # Use 1h candles for 1d period  
-            "2d": "4h",   # Use 4h candles for 2d period
-            "3d": "4h"    # Use 4h candles for 3d period
-        }
-        
-        valid_timeframe = timeframe_mapping.get(timeframe, "1h")
-        candles_needed = max(12, duration_minutes // (60 if valid_timeframe == "1h" else 240))
+        # Use the finest candle interval the period allows
+        candle_timeframe, candle_minutes = self.select_ohlcv_timeframe(duration_minutes)
+        until = self.exchange.milliseconds()
+        since = until - max(duration_minutes, 12 * candle_minutes) * 60 * 1000
         
-        # Fetch historical OHLCV data
-        ohlcv = self.fetch_ohlcv(symbol, valid_timeframe, limit=min(candles_needed, 1000))
+        # Fetch historical OHLCV data as concurrent paginated windows,
+        # only from the last saved candle when saved candles cover the period
+        ohlcv = self.fetch_candles(symbol, candle_timeframe, since, until)
         
         if ohlcv is None or ohlcv.empty:
-            print("⚠️ No historical data available, using current snapshot")
-            return self.get_liquidation_heatmap_data(symbol)
+            return None
         
+        return {
+            'current_price': ticker['last'],
+            'ohlcv': ohlcv,
+            'candle_timeframe': candle_timeframe
+        }
+    
+    def build_historical_data(self, symbol: str, timeframe: str, duration_minutes: int,
+                              current_price: float, ohlcv: pd.DataFrame, candle_timeframe: str) -> Dict:
+        """
+        Compute a historical heatmap from fetched inputs (no network calls).
+        """
         # Calculate price volatility and ranges
         price_min = ohlcv['low'].min()
         price_max = ohlcv['high'].max()
@@ -207,12 +455,12 @@ class LiquidationDataFetcher:
         
         # Create enhanced liquidation levels based on historical data
         liquidation_levels = self.calculate_enhanced_liquidation_levels(
-            current_price, price_min, price_max, volatility
+            current_price, price_min, price_max, volatility, symbol=symbol
         )
         
-        # Generate historical heatmap with time series
+        # Generate historical heatmap at display resolution
         heatmap_df = self.generate_historical_heatmap(
-            ohlcv, liquidation_levels, duration_minutes
+            self.downsample_ohlcv(ohlcv), liquidation_levels, duration_minutes
         )
         
         return {
@@ -224,6 +472,7 @@ class LiquidationDataFetcher:
             'timestamp': datetime.now(),
             'analysis_type': 'historical',
             'timeframe': timeframe,
+            'candle_timeframe': candle_timeframe,
             'duration_minutes': duration_minutes,
             'price_stats': {
                 'min': price_min,
@@ -233,49 +482,27 @@ class LiquidationDataFetcher:
             }
         }
     
-    def calculate_enhanced_liquidation_levels(self, current_price: float, price_min: float, 
-                                            price_max: float, volatility: float) -> Dict[str, List[float]]:
+    def get_historical_liquidation_data(self, symbol: str, timeframe: str, duration_minutes: int) -> Dict:
         """
-        Calculate enhanced liquidation levels based on historical price movements.
+        Get historical liquidation analysis over a specific timeframe.
         """
-        leverage_levels = [5, 10, 25, 50, 100, 125]
+        print(f"📊 Fetching historical data for {symbol} over {timeframe}...")
         
-        liquidation_levels = {
-            'long_liquidations': [],
-            'short_liquidations': []
-        }
+        inputs = self.fetch_historical_inputs(symbol, duration_minutes)
+        if not inputs:
+            print("⚠️ No historical data available, using current snapshot")
+            return self.get_liquidation_heatmap_data(symbol)
         
-        # Factor in historical volatility for more realistic liquidation zones
-        volatility_multiplier = max(1.0, min(2.0, 1 + volatility))
-        
-        for leverage in leverage_levels:
-            # Base liquidation calculation
-            base_long_liq = current_price * (1 - 1/leverage)
-            base_short_liq = current_price * (1 + 1/leverage)
-            
-            # Adjust based on historical ranges
-            range_factor = (price_max - price_min) / current_price
-            adjusted_range = range_factor * volatility_multiplier
-            
-            # Enhanced liquidation zones
-            long_liq_price = max(base_long_liq, price_min * 1.01)  # Don't go below historical low
-            short_liq_price = min(base_short_liq, price_max * 0.99)  # Don't go above historical high
-            
-            liquidation_levels['long_liquidations'].append({
-                'leverage': leverage,
-                'price': long_liq_price,
-                'distance_percent': ((current_price - long_liq_price) / current_price) * 100,
-                'risk_level': 'high' if leverage >= 50 else 'medium' if leverage >= 25 else 'low'
-            })
-            
-            liquidation_levels['short_liquidations'].append({
-                'leverage': leverage,
-                'price': short_liq_price,
-                'distance_percent': ((short_liq_price - current_price) / current_price) * 100,
-                'risk_level': 'high' if leverage >= 50 else 'medium' if leverage >= 25 else 'low'
-            })
-        
-        return liquidation_levels
+        return self.build_historical_data(symbol, timeframe, duration_minutes, **inputs)
+    
+    def calculate_enhanced_liquidation_levels(self, current_price: float, price_min: float, 
+                                            price_max: float, volatility: float,
+                                            symbol: str = None) -> Dict[str, List[float]]:
+        """
+        Calculate enhanced liquidation levels based on historical price movements:
+        levels are kept inside the historical low and high.
+        """
+        return self.level_engine_for(symbol).levels(current_price, price_min, price_max)
     
     def generate_historical_heatmap(self, ohlcv: pd.DataFrame, liquidation_levels: Dict,
                                   duration_minutes: int) -> pd.DataFrame:
@@ -286,7 +513,7 @@ class LiquidationDataFetcher:
             return pd.DataFrame()
         
         # Create time-based price grid
-        time_points = min(len(ohlcv), 50)  # Max 50 time points for visualization
+        time_points = min(len(ohlcv), self.display_time_points)  # Cap time points for visualization
         price_points = 100
         
         # Get price range from historical data
@@ -296,41 +523,25 @@ class LiquidationDataFetcher:
         price_grid = np.linspace(price_min, price_max, price_points)
         time_grid = ohlcv['timestamp'].iloc[-time_points:] if len(ohlcv) >= time_points else ohlcv['timestamp']
         
-        heatmap_data = []
-        
-        for i, timestamp in enumerate(time_grid):
-            # Get the price at this time point
-            if i < len(ohlcv):
-                historical_price = ohlcv.iloc[i]['close']
-                volume = ohlcv.iloc[i]['volume']
-            else:
-                historical_price = ohlcv.iloc[-1]['close']
-                volume = ohlcv.iloc[-1]['volume']
-            
-            for price in price_grid:
-                # Calculate liquidation intensity based on distance from historical price
-                distance_factor = abs(price - historical_price) / historical_price
-                
-                # Volume-weighted liquidation probability
-                long_intensity = volume * np.exp(-distance_factor * 10) if price < historical_price else 0
-                short_intensity = volume * np.exp(-distance_factor * 10) if price > historical_price else 0
-                
-                # Add leverage-based multipliers
-                for liq_level in liquidation_levels['long_liquidations']:
-                    if abs(price - liq_level['price']) < (price * 0.01):  # Within 1%
-                        long_intensity *= (1 + liq_level['leverage'] / 100)
-                
-                for liq_level in liquidation_levels['short_liquidations']:
-                    if abs(price - liq_level['price']) < (price * 0.01):
-                        short_intensity *= (1 + liq_level['leverage'] / 100)
-                
-                heatmap_data.append({
-                    'timestamp': timestamp,
-                    'price': price,
-                    'long_liquidation_volume': long_intensity,
-                    'short_liquidation_volume': short_intensity,
-                    'total_liquidation_volume': long_intensity + short_intensity,
-                    'historical_price': historical_price
-                })
-        
-        return pd.DataFrame(heatmap_data)
\ No newline at end of file
+        # Price at each time point
+        historical_prices = ohlcv['close'].values[:len(time_grid)][:, None]
+        volumes = ohlcv['volume'].values[:len(time_grid)][:, None]
+        
+        # Volume-weighted liquidation probability by distance from historical price
+        distance_factor = np.abs(price_grid[None, :] - historical_prices) / historical_prices
+        intensity = volumes * np.exp(-distance_factor * 10)
+        long_intensity = np.where(price_grid[None, :] < historical_prices, intensity, 0.0)
+        short_intensity = np.where(price_grid[None, :] > historical_prices, intensity, 0.0)
+        
+        # Add leverage-based multipliers within 1% of a liquidation level
+        long_intensity *= level_multipliers(price_grid, *side_arrays(liquidation_levels, 'long_liquidations'), 0.01)
+        short_intensity *= level_multipliers(price_grid, *side_arrays(liquidation_levels, 'short_liquidations'), 0.01)
+        
+        return pd.DataFrame({
+            'timestamp': np.repeat(time_grid.values, len(price_grid)),
+            'price': np.tile(price_grid, len(time_grid)),
+            'long_liquidation_volume': long_intensity.ravel(),
+            'short_liquidation_volume': short_intensity.ravel(),
+            'total_liquidation_volume': (long_intensity + short_intensity).ravel(),
+            'historical_price': np.repeat(historical_prices.ravel(), len(price_grid))
+        })
@@ -0,0 +1,32 @@
+import os
+import sys
+import urllib.request
+
+from warm_store import DEFAULT_READY_MAX_AGE_SECONDS, get_warm_store
+
+
+HEALTH_URL = 'http://localhost:8501/_stcore/health'
+
+
+def main():
+    """Container health: Streamlit is up and the warm-up has completed recently."""
+    url = os.environ.get('LIQ_HEALTH_URL', HEALTH_URL)
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            if response.status != 200:
+                print(f"❌ Streamlit health returned {response.status}")
+                sys.exit(1)
+    except OSError as e:
+        print(f"❌ Streamlit not responding: {e}")
+        sys.exit(1)
+
+    max_age = float(os.environ.get('LIQ_WARM_READY_MAX_AGE', DEFAULT_READY_MAX_AGE_SECONDS))
+    if not get_warm_store().is_ready(max_age):
+        print("⏳ Warm-up not complete")
+        sys.exit(1)
+
+    print("✅ Ready")
+
+
+if __name__ == "__main__":
+    main()
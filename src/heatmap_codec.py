@@ -0,0 +1,198 @@
+import struct
+import zlib
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+MAGIC = b'LHMF'
+FORMAT_VERSION = 1
+
+# Frame flags
+KEYFRAME = 0x01     # payload holds absolute codes, not XOR against a base frame
+UINT16 = 0x02       # codes are uint16 instead of uint8
+COMPRESSED = 0x04   # payload is zlib-compressed
+AXES = 0x08         # price/time axes follow the header
+LINEAR_AXES = 0x10  # axes are sent as (start, stop) and rebuilt with linspace
+LOG_SCALE = 0x20    # codes quantize log1p(intensity)
+
+# magic, version, flags, seq, base_seq, rows, cols, scale, current_price, timestamp_ms
+HEADER = struct.Struct('<4sBBIIIIddq')
+
+
+class QuantizedFrame:
+    def __init__(self, prices: np.ndarray, times: np.ndarray, codes: np.ndarray,
+                 scale: float, log_scale: bool):
+        """Quantized heatmap grid kept as the reference for the next delta."""
+        self.prices = prices
+        self.times = times
+        self.codes = codes
+        self.scale = scale
+        self.log_scale = log_scale
+
+    def intensities(self) -> np.ndarray:
+        values = self.codes.astype(np.float64) * self.scale
+        return np.expm1(values) if self.log_scale else values
+
+
+def quantize(prices: np.ndarray, times: np.ndarray, matrix: np.ndarray,
+             bits: int = 8, log_scale: bool = True) -> QuantizedFrame:
+    """Quantize a (price x time) intensity grid with one scale for the frame."""
+    values = np.nan_to_num(np.asarray(matrix, dtype=np.float64), nan=0.0).clip(min=0)
+    if log_scale:
+        values = np.log1p(values)
+    levels = (1 << bits) - 1
+    peak = float(values.max()) if values.size else 0.0
+    scale = peak / levels if peak > 0 else 1.0
+    dtype = np.uint16 if bits == 16 else np.uint8
+    codes = np.rint(values / scale).astype(dtype)
+    return QuantizedFrame(np.asarray(prices, dtype=np.float64), np.asarray(times, dtype=np.int64),
+                          codes, scale, log_scale)
+
+
+def _linear_bounds(axis: np.ndarray):
+    """(start, stop) if the axis is evenly spaced, else None."""
+    if len(axis) < 2:
+        return None
+    rebuilt = np.linspace(axis[0], axis[-1], len(axis))
+    if np.allclose(rebuilt, axis, rtol=0, atol=1e-9 * max(1.0, abs(float(axis[-1])))):
+        return float(axis[0]), float(axis[-1])
+    return None
+
+
+def _same_axes(frame: QuantizedFrame, base: QuantizedFrame) -> bool:
+    return (np.array_equal(frame.prices, base.prices) and np.array_equal(frame.times, base.times))
+
+
+def encode_frame(frame: QuantizedFrame, seq: int, current_price: float, timestamp_ms: int,
+                 base: QuantizedFrame = None, base_seq: int = None, compress: bool = True) -> bytes:
+    """
+    Encode a quantized frame.
+
+    With a base frame of the same shape the codes are XORed against it, so
+    unchanged cells become zero and compress to almost nothing; otherwise a
+    keyframe is written. Axes are only sent when they differ from the base.
+    """
+    rows, cols = frame.codes.shape
+    delta = base is not None and base.codes.shape == frame.codes.shape and base.codes.dtype == frame.codes.dtype
+    flags = 0
+    if frame.codes.dtype == np.uint16:
+        flags |= UINT16
+    if frame.log_scale:
+        flags |= LOG_SCALE
+
+    if delta:
+        payload = np.bitwise_xor(frame.codes, base.codes).tobytes()
+    else:
+        flags |= KEYFRAME
+        payload = frame.codes.tobytes()
+        base_seq = seq
+
+    axes = b''
+    if not delta or not _same_axes(frame, base):
+        flags |= AXES
+        price_bounds = _linear_bounds(frame.prices)
+        time_bounds = _linear_bounds(frame.times)
+        if price_bounds is not None and (time_bounds is not None or cols == 1):
+            flags |= LINEAR_AXES
+            time_start, time_stop = time_bounds or (frame.times[0], frame.times[0])
+            axes = struct.pack('<ddqq', *price_bounds, int(round(time_start)), int(round(time_stop)))
+        else:
+            axes = frame.prices.astype('<f8').tobytes() + frame.times.astype('<i8').tobytes()
+
+    if compress:
+        flags |= COMPRESSED
+        payload = zlib.compress(payload, 6)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, seq, base_seq, rows, cols,
+                         frame.scale, current_price, int(timestamp_ms))
+    return header + axes + payload
+
+
+class HeatmapStreamDecoder:
+    def __init__(self):
+        """Client-side decoder holding the last frame to apply deltas to."""
+        self.seq = None
+        self.frame: QuantizedFrame = None
+
+    def decode(self, data: bytes) -> Dict:
+        """Decode one frame and return the reconstructed heatmap grid."""
+        magic, version, flags, seq, base_seq, rows, cols, scale, current_price, timestamp_ms = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a heatmap frame")
+        offset = HEADER.size
+
+        if flags & KEYFRAME:
+            base = None
+        elif self.frame is None or self.seq != base_seq:
+            raise ValueError(f"Delta frame {seq} needs base {base_seq}, decoder holds {self.seq}")
+        else:
+            base = self.frame
+
+        if flags & AXES:
+            if flags & LINEAR_AXES:
+                price_start, price_stop, time_start, time_stop = struct.unpack_from('<ddqq', data, offset)
+                offset += struct.calcsize('<ddqq')
+                prices = np.linspace(price_start, price_stop, rows)
+                times = np.linspace(time_start, time_stop, cols).round().astype(np.int64)
+            else:
+                prices = np.frombuffer(data, dtype='<f8', count=rows, offset=offset)
+                offset += rows * 8
+                times = np.frombuffer(data, dtype='<i8', count=cols, offset=offset)
+                offset += cols * 8
+        else:
+            prices, times = base.prices, base.times
+
+        payload = data[offset:]
+        if flags & COMPRESSED:
+            payload = zlib.decompress(payload)
+        dtype = np.uint16 if flags & UINT16 else np.uint8
+        codes = np.frombuffer(payload, dtype=dtype).reshape(rows, cols)
+        if base is not None:
+            codes = np.bitwise_xor(codes, base.codes)
+
+        self.frame = QuantizedFrame(prices, times, codes, scale, bool(flags & LOG_SCALE))
+        self.seq = seq
+        return {
+            'seq': seq,
+            'price': prices,
+            'time': times,
+            'intensity': self.frame.intensities(),
+            'current_price': current_price,
+            'timestamp_ms': timestamp_ms
+        }
+
+
+class HeatmapStreamEncoder:
+    def __init__(self, bits: int = 8, log_scale: bool = True, compress: bool = True):
+        """
+        Server-side encoder for one (exchange, symbol) stream.
+
+        Every frame is available as a keyframe and, when that is smaller, as
+        a delta against the previous frame, so a polling client that is one
+        version behind only downloads the delta. Sequence numbers must
+        increase (the API uses wall-clock based versions, unique across
+        restarts) so a delta is never applied to a stale base.
+        """
+        self.bits = bits
+        self.log_scale = log_scale
+        self.compress = compress
+        self.seq = None
+        self.frame: QuantizedFrame = None
+
+    def encode(self, seq: int, prices: np.ndarray, times: np.ndarray, matrix: np.ndarray,
+               current_price: float, timestamp_ms: int) -> Tuple[bytes, bytes]:
+        """Return (keyframe, delta) for the new frame; delta is None without a usable base."""
+        frame = quantize(prices, times, matrix, self.bits, self.log_scale)
+        keyframe = encode_frame(frame, seq, current_price, timestamp_ms, compress=self.compress)
+        delta = None
+        if self.frame is not None and self.frame.codes.shape == frame.codes.shape and seq > self.seq:
+            delta = encode_frame(frame, seq, current_price, timestamp_ms,
+                                 base=self.frame, base_seq=self.seq, compress=self.compress)
+            # Shifted grids (e.g. historical windows moving in time) XOR badly
+            if len(delta) >= len(keyframe):
+                delta = None
+        self.frame = frame
+        self.seq = seq
+        return keyframe, delta
@@ -0,0 +1,158 @@
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Leverages liquidation levels are computed for by default
+DEFAULT_LEVERAGE_LEVELS = [5, 10, 25, 50, 100, 125]
+
+# Summed log boost of the default grid's levels, the most any grid may add up to
+DEFAULT_LOG_BOOST = float(np.log1p(np.asarray(DEFAULT_LEVERAGE_LEVELS, dtype=float) / 100).sum())
+
+
+def risk_level(leverage: float) -> str:
+    return 'high' if leverage >= 50 else 'medium' if leverage >= 25 else 'low'
+
+
+def normalize_brackets(brackets) -> Tuple[Tuple[float, float, float], ...]:
+    """
+    Maintenance-margin brackets as a hashable tuple of
+    (max_notional, max_leverage, maintenance_margin_rate), smallest first.
+    Accepts ccxt leverage tiers (`fetch_market_leverage_tiers` output) or
+    such tuples; None or empty means no maintenance margin.
+    """
+    normalized = []
+    for bracket in brackets or ():
+        if isinstance(bracket, dict):
+            max_notional = bracket.get('maxNotional')
+            bracket = (
+                float('inf') if max_notional is None else max_notional,
+                bracket['maxLeverage'],
+                bracket['maintenanceMarginRate']
+            )
+        normalized.append(tuple(float(value) for value in bracket))
+    return tuple(sorted(normalized))
+
+
+def maintenance_rates(leverages: np.ndarray, brackets: Tuple, position_notional: float = None) -> np.ndarray:
+    """
+    Maintenance margin rate per leverage: that of the first (smallest)
+    bracket allowing the leverage, or with `position_notional` the first
+    bracket covering that notional and allowing the leverage. Leverages
+    no such bracket allows get the first candidate bracket's rate.
+    """
+    if not brackets:
+        return np.zeros(len(leverages))
+    max_notional = np.array([bracket[0] for bracket in brackets])
+    max_leverage = np.array([bracket[1] for bracket in brackets])
+    rates = np.array([bracket[2] for bracket in brackets])
+    covers = np.ones(len(brackets), dtype=bool)
+    if position_notional is not None and (max_notional >= position_notional).any():
+        covers = max_notional >= position_notional
+    allowed = covers[None, :] & (max_leverage[None, :] >= leverages[:, None])
+    fallback = int(np.argmax(covers))
+    return rates[np.where(allowed.any(axis=1), np.argmax(allowed, axis=1), fallback)]
+
+
+def level_multipliers(price_grid: np.ndarray, level_prices: np.ndarray, leverages: np.ndarray,
+                      tolerance: float) -> np.ndarray:
+    """
+    Per grid price, the product of (1 + leverage / 100) over the liquidation
+    levels within `tolerance` (relative) of it; 1 where there are none.
+
+    Each boost is weighted by the grid's density: a grid whose boosts
+    together exceed those of the default grid has them scaled down to that
+    total, so a dense leverage grid (say 1-125 in steps of 1) stays as
+    intense as the default one instead of multiplying dozens of
+    neighbouring levels.
+    """
+    price_grid = np.asarray(price_grid, dtype=float)
+    if len(level_prices) == 0:
+        return np.ones(len(price_grid))
+    log_boosts = np.log1p(np.asarray(leverages, dtype=float) / 100)
+    weight = min(1.0, DEFAULT_LOG_BOOST / log_boosts.sum())
+    near = np.abs(price_grid[:, None] - level_prices[None, :]) < price_grid[:, None] * tolerance
+    return np.exp(np.where(near, log_boosts[None, :], 0.0).sum(axis=1) * weight)
+
+
+def side_arrays(liquidation_levels: Dict, side: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(prices, leverages) of one side of a liquidation levels dict."""
+    levels = liquidation_levels[side]
+    return (np.array([liq['price'] for liq in levels], dtype=float),
+            np.array([liq['leverage'] for liq in levels], dtype=float))
+
+
+class LeverageLevelEngine:
+    def __init__(self, leverage_levels: List[float] = None, brackets=None,
+                 position_notional: float = None):
+        """
+        Liquidation levels for a leverage grid and maintenance-margin table.
+
+        For longs: Liquidation Price = Entry Price * (1 - 1/Leverage + MMR)
+        For shorts: Liquidation Price = Entry Price * (1 + 1/Leverage - MMR)
+
+        The MMR per leverage comes from the smallest bracket allowing it, or
+        from the bracket of `position_notional` when given. The engine caches
+        the per-leverage factors of its (grid, table): `level_prices` applies
+        them to any number of prices as one array operation and `levels`
+        builds the per-leverage dicts the app uses from the exact price.
+        """
+        self.leverage_levels = list(leverage_levels or DEFAULT_LEVERAGE_LEVELS)
+        self.brackets = normalize_brackets(brackets)
+        self.position_notional = position_notional
+        self.leverages = np.asarray(self.leverage_levels, dtype=float)
+        self.mmr = maintenance_rates(self.leverages, self.brackets, position_notional)
+        self.long_factors = 1 - 1 / self.leverages + self.mmr
+        self.short_factors = 1 + 1 / self.leverages - self.mmr
+        self.risk_levels = [risk_level(leverage) for leverage in self.leverage_levels]
+
+    def level_prices(self, current_price, price_min=None, price_max=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Long and short liquidation prices for one price or an array of prices
+        (one row per price, one column per leverage). With a historical range
+        they are kept 1% inside its low and high.
+        """
+        current_price = np.asarray(current_price, dtype=float)[..., None]
+        long_prices = current_price * self.long_factors
+        short_prices = current_price * self.short_factors
+        if price_min is not None:
+            long_prices = np.maximum(long_prices, np.asarray(price_min, dtype=float)[..., None] * 1.01)
+        if price_max is not None:
+            short_prices = np.minimum(short_prices, np.asarray(price_max, dtype=float)[..., None] * 0.99)
+        return long_prices, short_prices
+
+    def levels(self, current_price: float, price_min: float = None, price_max: float = None) -> Dict:
+        """Liquidation levels dict (long and short entries per leverage) for the exact price."""
+        current_price = float(current_price)
+        long_prices, short_prices = self.level_prices(current_price, price_min, price_max)
+        long_distances = (current_price - long_prices) / current_price * 100
+        short_distances = (short_prices - current_price) / current_price * 100
+        return {
+            'long_liquidations': [
+                {'leverage': leverage, 'price': price, 'distance_percent': distance, 'risk_level': risk}
+                for leverage, price, distance, risk in zip(self.leverage_levels, long_prices.tolist(),
+                                                           long_distances.tolist(), self.risk_levels)
+            ],
+            'short_liquidations': [
+                {'leverage': leverage, 'price': price, 'distance_percent': distance, 'risk_level': risk}
+                for leverage, price, distance, risk in zip(self.leverage_levels, short_prices.tolist(),
+                                                           short_distances.tolist(), self.risk_levels)
+            ]
+        }
+
+
+_engines: Dict[Tuple, LeverageLevelEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_level_engine(leverage_levels: List[float] = None, brackets=None,
+                     position_notional: float = None) -> LeverageLevelEngine:
+    """Shared engine per (leverage grid, maintenance-margin table, position notional)."""
+    key = (tuple(leverage_levels or DEFAULT_LEVERAGE_LEVELS), normalize_brackets(brackets), position_notional)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = LeverageLevelEngine(*key)
+            _engines[key] = engine
+        return engine
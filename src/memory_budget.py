@@ -0,0 +1,281 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+
+MB = 1024 * 1024
+
+# Defaults sized for the small droplets in DEPLOYMENT.md (512 MB - 1 GB RAM)
+DEFAULT_GLOBAL_BUDGET_MB = 300
+DEFAULT_SESSION_BUDGET_MB = 30
+DEFAULT_RSS_BUDGET_MB = 400
+DEFAULT_SESSION_TTL_SECONDS = 1800
+
+
+def estimate_size(obj, _depth: int = 0) -> int:
+    """Approximate bytes held by an object, following containers a few levels deep."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    if hasattr(obj, 'to_plotly_json'):
+        return estimate_size(obj.to_plotly_json(), _depth)
+    if _depth >= 6:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(value, _depth + 1) for value in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_size(item, _depth + 1) for item in obj)
+    return sys.getsizeof(obj)
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes (0 if unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+@contextmanager
+def measure(trace_allocations: bool = None):
+    """
+    Measure a block in this process: yields a dict that is filled with
+    'allocated', 'peak' (bytes) and 'seconds' when the block exits. Uses
+    tracemalloc when it is tracing, otherwise the change in RSS.
+    """
+    if trace_allocations is None:
+        trace_allocations = tracemalloc.is_tracing()
+    usage = {'allocated': 0, 'peak': 0, 'seconds': 0.0}
+    if trace_allocations:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    else:
+        before = process_rss()
+    started = time.monotonic()
+    try:
+        yield usage
+    finally:
+        if trace_allocations:
+            after, peak = tracemalloc.get_traced_memory()
+            peak_delta = peak - before
+        else:
+            after = process_rss()
+            peak_delta = after - before
+        usage.update(allocated=max(0, after - before), peak=max(0, peak_delta),
+                     seconds=time.monotonic() - started)
+
+
+class MemoryTracker:
+    def __init__(self, global_budget_mb: float = DEFAULT_GLOBAL_BUDGET_MB,
+                 session_budget_mb: float = DEFAULT_SESSION_BUDGET_MB,
+                 session_ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS,
+                 trace_allocations: bool = False, rss_budget_mb: float = DEFAULT_RSS_BUDGET_MB):
+        """
+        Memory accounting for the app.
+
+        Per-session state is held here with its estimated size; a session
+        over its budget loses its least recently used entries. When the
+        process-wide total exceeds the global budget, or the process RSS
+        (interpreter, libraries, Streamlit's caches, ...) exceeds
+        `rss_budget_mb`, registered caches are evicted first, then the oldest
+        session entries, until the tracked total has dropped by the larger
+        overshoot. Pipeline stages can
+        be measured with `stage()`; with `trace_allocations` they report
+        tracemalloc allocations, otherwise the change in RSS. Stages that run
+        in another process are measured there with `measure()` and reported
+        with `record_stage()`.
+        """
+        self.global_budget = global_budget_mb * MB
+        self.session_budget = session_budget_mb * MB
+        self.rss_budget = rss_budget_mb * MB
+        self.session_ttl_seconds = session_ttl_seconds
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self._lock = threading.RLock()
+        # session id -> OrderedDict[key -> (object, size, last access)], LRU first
+        self._sessions: Dict[str, OrderedDict] = {}
+        self._session_seen: Dict[str, float] = {}
+        self._caches: Dict[str, Dict] = {}
+        self._stages: Dict[str, Dict] = {}
+        self._evictions = 0
+
+    # Pipeline stages
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record allocations (or RSS growth) and duration of a pipeline stage run in this process."""
+        try:
+            with measure(self.trace_allocations) as usage:
+                yield
+        finally:
+            self.record_stage(name, **usage)
+
+    def record_stage(self, name: str, allocated: int, peak: int, seconds: float) -> None:
+        """Add one measured call of a stage."""
+        with self._lock:
+            stats = self._stages.setdefault(name, {'calls': 0, 'allocated': 0, 'peak': 0, 'seconds': 0.0})
+            stats['calls'] += 1
+            stats['allocated'] += allocated
+            stats['peak'] = max(stats['peak'], peak)
+            stats['seconds'] += seconds
+
+    # Per-session state
+
+    def put(self, session_id: str, key: str, obj) -> None:
+        """Hold `obj` for a session, then enforce the budgets."""
+        size = estimate_size(obj)
+        with self._lock:
+            entries = self._sessions.setdefault(session_id, OrderedDict())
+            entries[key] = (obj, size, time.monotonic())
+            entries.move_to_end(key)
+            self._session_seen[session_id] = time.monotonic()
+            self._enforce_session(session_id)
+            self._enforce_global()
+
+    def get(self, session_id: str, key: str, default=None):
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            if not entries or key not in entries:
+                return default
+            obj, size, _ = entries[key]
+            entries[key] = (obj, size, time.monotonic())
+            entries.move_to_end(key)
+            self._session_seen[session_id] = time.monotonic()
+            return obj
+
+    def drop_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._session_seen.pop(session_id, None)
+
+    def session_footprint(self, session_id: str) -> int:
+        with self._lock:
+            return sum(size for _, size, _ in self._sessions.get(session_id, {}).values())
+
+    # Shared caches
+
+    def register_cache(self, name: str, size_fn: Callable[[], int], evict_fn: Callable[[], None]) -> None:
+        """Track a shared cache; `evict_fn` empties it when the global budget is exceeded."""
+        with self._lock:
+            self._caches[name] = {'size': size_fn, 'evict': evict_fn}
+
+    def _cache_sizes(self) -> Dict[str, int]:
+        sizes = {}
+        for name, cache in self._caches.items():
+            try:
+                sizes[name] = int(cache['size']())
+            except Exception as e:
+                print(f"Error sizing cache {name}: {e}")
+                sizes[name] = 0
+        return sizes
+
+    # Budgets
+
+    def total(self) -> int:
+        with self._lock:
+            sessions = sum(size for entries in self._sessions.values() for _, size, _ in entries.values())
+            return sessions + sum(self._cache_sizes().values())
+
+    def _enforce_session(self, session_id: str) -> None:
+        entries = self._sessions[session_id]
+        # Keep the newest entry even if it alone exceeds the budget
+        while len(entries) > 1 and self.session_footprint(session_id) > self.session_budget:
+            entries.popitem(last=False)
+            self._evictions += 1
+
+    def _enforce_global(self) -> None:
+        now = time.monotonic()
+        for session_id, seen in list(self._session_seen.items()):
+            if now - seen > self.session_ttl_seconds:
+                self.drop_session(session_id)
+
+        # Evicting cannot bring RSS down to a number, only free what is
+        # tracked, so both overshoots become a target for the tracked total
+        total = self.total()
+        overshoot = max(total - self.global_budget, process_rss() - self.rss_budget)
+        if overshoot <= 0:
+            return
+        target = total - overshoot
+
+        # Shared caches can be rebuilt from the exchange, so they go first
+        for name, size in sorted(self._cache_sizes().items(), key=lambda item: -item[1]):
+            if size:
+                self._caches[name]['evict']()
+                self._evictions += 1
+                if self.total() <= target:
+                    return
+
+        # Then the least recently used session entries across all sessions
+        while self.total() > target:
+            oldest = None
+            for session_id, entries in self._sessions.items():
+                if entries:
+                    key, (_, _, accessed) = next(iter(entries.items()))
+                    if oldest is None or accessed < oldest[2]:
+                        oldest = (session_id, key, accessed)
+            if oldest is None:
+                return
+            del self._sessions[oldest[0]][oldest[1]]
+            self._evictions += 1
+
+    # Diagnostics
+
+    def report(self, top: int = 10) -> Dict:
+        """Summary of memory use with the biggest holders first."""
+        with self._lock:
+            holders = [
+                {'holder': f"session {session_id[:8]} / {key}", 'bytes': size}
+                for session_id, entries in self._sessions.items()
+                for key, (_, size, _) in entries.items()
+            ]
+            cache_sizes = self._cache_sizes()
+            holders.extend({'holder': f"cache {name}", 'bytes': size} for name, size in cache_sizes.items())
+            holders.sort(key=lambda holder: -holder['bytes'])
+
+            return {
+                'rss_bytes': process_rss(),
+                'tracked_bytes': sum(holder['bytes'] for holder in holders),
+                'global_budget_bytes': self.global_budget,
+                'rss_budget_bytes': self.rss_budget,
+                'session_budget_bytes': self.session_budget,
+                'sessions': {
+                    session_id[:8]: self.session_footprint(session_id) for session_id in self._sessions
+                },
+                'evictions': self._evictions,
+                'top_holders': holders[:top],
+                'stages': {name: dict(stats) for name, stats in self._stages.items()}
+            }
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> MemoryTracker:
+    """Process-wide tracker configured from LIQ_MEMORY_BUDGET_MB / LIQ_SESSION_BUDGET_MB / LIQ_RSS_BUDGET_MB."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = MemoryTracker(
+                float(os.environ.get('LIQ_MEMORY_BUDGET_MB', DEFAULT_GLOBAL_BUDGET_MB)),
+                float(os.environ.get('LIQ_SESSION_BUDGET_MB', DEFAULT_SESSION_BUDGET_MB)),
+                trace_allocations=os.environ.get('LIQ_TRACE_MEMORY') == '1',
+                rss_budget_mb=float(os.environ.get('LIQ_RSS_BUDGET_MB', DEFAULT_RSS_BUDGET_MB))
+            )
+        return _tracker
@@ -0,0 +1,16 @@
+from typing import List, Tuple
+
+
+# Pairs kept fresh in the background by default (API refresher and warm-up)
+DEFAULT_PAIRS = 'binance:BTC/USDT,binance:ETH/USDT,binance:BNB/USDT,binance:SOL/USDT'
+
+
+def parse_pairs(spec: str) -> List[Tuple[str, str]]:
+    """Parse "binance:BTC/USDT,okx:ETH/USDT" into (exchange, symbol) pairs."""
+    pairs = []
+    for item in spec.split(','):
+        item = item.strip()
+        if item:
+            exchange, symbol = item.split(':', 1)
+            pairs.append((exchange.strip(), symbol.strip()))
+    return pairs
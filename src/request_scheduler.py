@@ -0,0 +1,315 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+import ccxt
+import numpy as np
+
+
+# Priority classes, lowest value is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+BACKFILL = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: 'interactive',
+    BACKGROUND: 'background',
+    BACKFILL: 'backfill'
+}
+
+# Request weight budget per exchange (weight units per minute)
+EXCHANGE_WEIGHT_LIMITS = {
+    'binance': 2400,  # USD-M futures IP limit
+    'okx': 600,
+    'bybit': 1200
+}
+DEFAULT_WEIGHT_LIMIT = 1200
+
+
+def _binance_depth_weight(limit: int = None) -> int:
+    """Binance futures /depth weight for the requested number of levels."""
+    if limit is None or limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+def _binance_klines_weight(limit: int = None) -> int:
+    """Binance futures /klines weight for the requested number of candles."""
+    if limit is None or limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+# Endpoint weights per exchange: a fixed int or a function of `limit`
+ENDPOINT_WEIGHTS = {
+    'binance': {
+        'fetch_order_book': _binance_depth_weight,
+        'fetch_ohlcv': _binance_klines_weight,
+        'fetch_ticker': 1,
+        'load_markets': 1
+    }
+}
+
+
+def endpoint_weight(exchange_id: str, endpoint: str, limit: int = None) -> int:
+    """Return the rate-limit weight of one call to `endpoint`."""
+    weight = ENDPOINT_WEIGHTS.get(exchange_id, {}).get(endpoint, 1)
+    return weight(limit) if callable(weight) else weight
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        """Token bucket holding at most `capacity` weight units."""
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated = now
+
+    def delay(self, weight: float, now: float) -> float:
+        """Seconds until `weight` tokens can be taken (0 if available now)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        weight = min(weight, self.capacity)
+        if self.tokens >= weight:
+            return 0.0
+        return (weight - self.tokens) / self.refill_per_second
+
+    def consume(self, weight: float) -> None:
+        self.tokens -= min(weight, self.capacity)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` and drain the bucket."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class _ScheduledRequest:
+    __slots__ = ('exchange_id', 'symbol', 'endpoint', 'weight', 'priority',
+                 'fn', 'future', 'enqueued', 'attempts')
+
+    def __init__(self, exchange_id, symbol, endpoint, weight, priority, fn):
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.endpoint = endpoint
+        self.weight = weight
+        self.priority = priority
+        self.fn = fn
+        self.future = Future()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class RequestScheduler:
+    def __init__(self, workers: int = 4, max_retries: int = 3,
+                 backoff_seconds: float = 2.0, ban_backoff_seconds: float = 60.0,
+                 weight_limits: Dict[str, int] = None):
+        """
+        Shared scheduler for exchange calls.
+
+        Each exchange gets a token bucket sized by its weight limit. Queued
+        calls are served by priority class, round-robin across symbols within
+        a class, and back off the whole exchange on 429/418 responses.
+        """
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.ban_backoff_seconds = ban_backoff_seconds
+        self.weight_limits = dict(EXCHANGE_WEIGHT_LIMITS, **(weight_limits or {}))
+
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        # priority -> OrderedDict[(exchange, symbol) -> deque of requests]
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self._stats = {'completed': 0, 'failed': 0, 'retried': 0, 'backoffs': 0}
+        self._stopped = False
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"request-scheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _bucket(self, exchange_id: str) -> TokenBucket:
+        bucket = self._buckets.get(exchange_id)
+        if bucket is None:
+            per_minute = self.weight_limits.get(exchange_id, DEFAULT_WEIGHT_LIMIT)
+            bucket = TokenBucket(per_minute, per_minute / 60.0)
+            self._buckets[exchange_id] = bucket
+        return bucket
+
+    def submit(self, exchange_id: str, endpoint: str, fn: Callable, symbol: str = None,
+               priority: int = INTERACTIVE, weight: int = None, limit: int = None) -> Future:
+        """Queue `fn()` as one call to `endpoint` and return its Future."""
+        if weight is None:
+            weight = endpoint_weight(exchange_id, endpoint, limit)
+        request = _ScheduledRequest(exchange_id, symbol, endpoint, weight, priority, fn)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Request scheduler has been shut down")
+            self._enqueue(request)
+        return request.future
+
+    def call(self, exchange_id: str, endpoint: str, fn: Callable, symbol: str = None,
+             priority: int = INTERACTIVE, weight: int = None, limit: int = None):
+        """Submit a call and block until its result is available."""
+        return self.submit(exchange_id, endpoint, fn, symbol, priority, weight, limit).result()
+
+    def _enqueue(self, request: _ScheduledRequest) -> None:
+        symbols = self._queues[request.priority]
+        key = (request.exchange_id, request.symbol)
+        if key not in symbols:
+            symbols[key] = deque()
+        symbols[key].append(request)
+        self._cond.notify()
+
+    def _next_request(self) -> Tuple[_ScheduledRequest, float]:
+        """
+        Pick the next runnable request, or return how long to wait.
+
+        An exchange whose higher-priority work is waiting for tokens is not
+        served to lower classes, so background work never starves interactive
+        calls of weight.
+        """
+        now = time.monotonic()
+        blocked = set()
+        wait = None
+        for priority in sorted(self._queues):
+            symbols = self._queues[priority]
+            for key in list(symbols):
+                request = symbols[key][0]
+                if request.exchange_id in blocked:
+                    continue
+                bucket = self._bucket(request.exchange_id)
+                delay = bucket.delay(request.weight, now)
+                if delay <= 0:
+                    symbols[key].popleft()
+                    if symbols[key]:
+                        symbols.move_to_end(key)
+                    else:
+                        del symbols[key]
+                    bucket.consume(request.weight)
+                    return request, None
+                blocked.add(request.exchange_id)
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    request, wait = self._next_request()
+                    if request is not None:
+                        break
+                    self._cond.wait(wait)
+                if request.attempts == 0:
+                    self._waits[request.priority].append(time.monotonic() - request.enqueued)
+
+            if request.attempts == 0 and not request.future.set_running_or_notify_cancel():
+                continue
+            self._run(request)
+
+    def _run(self, request: _ScheduledRequest) -> None:
+        try:
+            result = request.fn()
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection) as e:
+            banned = isinstance(e, ccxt.DDoSProtection) or '418' in str(e)
+            base = self.ban_backoff_seconds if banned else self.backoff_seconds
+            delay = base * (2 ** request.attempts)
+            print(f"⏳ {request.exchange_id} rate limited ({'418' if banned else '429'}), "
+                  f"backing off {delay:.1f}s")
+            with self._cond:
+                self._bucket(request.exchange_id).pause(delay)
+                self._stats['backoffs'] += 1
+                if request.attempts < self.max_retries:
+                    request.attempts += 1
+                    self._stats['retried'] += 1
+                    self._enqueue(request)
+                    return
+                self._stats['failed'] += 1
+            request.future.set_exception(e)
+            return
+        except Exception as e:
+            with self._cond:
+                self._stats['failed'] += 1
+            request.future.set_exception(e)
+            return
+
+        with self._cond:
+            self._stats['completed'] += 1
+        request.future.set_result(result)
+
+    def metrics(self) -> Dict:
+        """Queue depth, wait-time and bucket metrics for monitoring."""
+        with self._cond:
+            now = time.monotonic()
+            queue_depth = {
+                PRIORITY_NAMES[priority]: sum(len(q) for q in symbols.values())
+                for priority, symbols in self._queues.items()
+            }
+            wait_times = {}
+            for priority, waits in self._waits.items():
+                samples = np.array(waits) if waits else np.zeros(1)
+                wait_times[PRIORITY_NAMES[priority]] = {
+                    'samples': len(waits),
+                    'mean': float(samples.mean()),
+                    'p95': float(np.percentile(samples, 95)),
+                    'max': float(samples.max())
+                }
+            buckets = {}
+            for exchange_id, bucket in self._buckets.items():
+                bucket.delay(0, now)
+                buckets[exchange_id] = {
+                    'tokens': bucket.tokens,
+                    'capacity': bucket.capacity,
+                    'paused_for': max(0.0, bucket.paused_until - now)
+                }
+            return {
+                'queue_depth': queue_depth,
+                'wait_seconds': wait_times,
+                'buckets': buckets,
+                **self._stats
+            }
+
+    def shutdown(self) -> None:
+        """Stop the workers and cancel anything still queued."""
+        with self._cond:
+            self._stopped = True
+            for symbols in self._queues.values():
+                for queue in symbols.values():
+                    for request in queue:
+                        request.future.cancel()
+                symbols.clear()
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler shared by all fetchers."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
@@ -0,0 +1,342 @@
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+# One index record per archived frame: epoch seconds, byte offset and length in the chunk file
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('offset', '<u8'), ('length', '<u8')])
+
+CHUNK_SUFFIX = '.chunk'
+INDEX_SUFFIX = '.idx'
+COMPACTED_MARK = 'c'
+
+# Stream real-time snapshots are archived to; historical ones get one per period
+REALTIME_STREAM = 'real-time'
+
+
+def snapshot_stream(data: Dict) -> str:
+    """Archive stream of a snapshot: its analysis type, plus the period for historical ones."""
+    analysis_type = data.get('analysis_type', REALTIME_STREAM)
+    if analysis_type == 'historical' and data.get('timeframe'):
+        return f"historical-{data['timeframe']}"
+    return analysis_type
+
+
+def thin_positions(count: int, max_count: int = None) -> np.ndarray:
+    """At most `max_count` evenly spaced positions out of `count`, always keeping the first and last."""
+    if max_count is None or count <= max_count:
+        return np.arange(count)
+    return np.unique(np.linspace(0, count - 1, max_count).round().astype(np.int64))
+
+
+def _encode_frame(data: Dict) -> bytes:
+    """Serialize a heatmap snapshot into a compressed frame."""
+    heatmap_df = data['heatmap_data']
+    columns = []
+    buffers = []
+    for name in heatmap_df.columns:
+        values = heatmap_df[name].to_numpy()
+        kind = str(values.dtype)
+        if np.issubdtype(values.dtype, np.datetime64):
+            kind = 'datetime64[ns]'
+            values = values.astype('datetime64[ns]').view('<i8')
+        values = np.ascontiguousarray(values)
+        columns.append({'name': name, 'dtype': kind, 'storage': values.dtype.str})
+        buffers.append(values.tobytes())
+
+    meta = {
+        'symbol': data['symbol'],
+        'current_price': data['current_price'],
+        'liquidation_levels': data['liquidation_levels'],
+        'analysis_type': data.get('analysis_type', 'real-time'),
+        'timeframe': data.get('timeframe'),
+        'duration_minutes': data.get('duration_minutes'),
+        'price_stats': data.get('price_stats'),
+        'rows': len(heatmap_df),
+        'columns': columns
+    }
+    header = json.dumps(meta, default=float).encode()
+    return len(header).to_bytes(4, 'little') + header + b''.join(buffers)
+
+
+def _decode_frame(payload: bytes, timestamp: float) -> Dict:
+    """Rebuild the snapshot dict produced by the data fetcher from a frame."""
+    header_len = int.from_bytes(payload[:4], 'little')
+    meta = json.loads(payload[4:4 + header_len])
+    offset = 4 + header_len
+    rows = meta['rows']
+
+    columns = {}
+    for column in meta['columns']:
+        storage = np.dtype(column['storage'])
+        size = storage.itemsize * rows
+        values = np.frombuffer(payload, dtype=storage, count=rows, offset=offset)
+        if column['dtype'] == 'datetime64[ns]':
+            values = values.view('datetime64[ns]')
+        columns[column['name']] = values
+        offset += size
+
+    data = {key: meta[key] for key in ('symbol', 'current_price', 'liquidation_levels',
+                                       'analysis_type', 'timeframe', 'duration_minutes',
+                                       'price_stats') if meta.get(key) is not None}
+    data.update({
+        'heatmap_data': pd.DataFrame(columns),
+        'ohlcv': None,
+        'timestamp': datetime.fromtimestamp(timestamp),
+        'replay': True
+    })
+    return data
+
+
+class SnapshotArchive:
+    def __init__(self, root: str = 'data/archive', chunk_frames: int = 500,
+                 retention_days: float = 30, compact_after_hours: float = 24,
+                 compact_interval_seconds: float = 300, compression_level: int = 6,
+                 min_interval_seconds: float = 10, maintain_interval_seconds: float = 3600):
+        """
+        Append-only archive of heatmap snapshots.
+
+        Frames are zlib-compressed and appended to chunk files per
+        (exchange, symbol, stream), a stream per analysis type (see
+        `snapshot_stream`); a fixed-width timestamp index next to each chunk
+        lets range queries memory-map and decompress only the frames inside
+        the requested window. Snapshots arriving within
+        `min_interval_seconds` of the stream's last frame (e.g. the same
+        heatmap computed by several sessions) are dropped. Chunks older than
+        `compact_after_hours` are thinned to one frame per
+        `compact_interval_seconds`, and chunks older than `retention_days`
+        are deleted; appends run that maintenance over every stream, idle
+        ones included, at most once per `maintain_interval_seconds`.
+        Readers take no lock and retry when maintenance replaces a chunk
+        under them.
+        """
+        self.root = root
+        self.chunk_frames = chunk_frames
+        self.retention_days = retention_days
+        self.compact_after_hours = compact_after_hours
+        self.compact_interval_seconds = compact_interval_seconds
+        self.compression_level = compression_level
+        self.min_interval_seconds = min_interval_seconds
+        self.maintain_interval_seconds = maintain_interval_seconds
+        self._last_maintained = 0.0
+        self._lock = threading.Lock()
+
+    def _symbol_dir(self, exchange: str, symbol: str, stream: str = REALTIME_STREAM) -> str:
+        return os.path.join(self.root, exchange, symbol.replace('/', '-').replace(':', '_'), stream)
+
+    def streams(self, exchange: str, symbol: str) -> List[str]:
+        """Streams archived for a symbol."""
+        directory = os.path.dirname(self._symbol_dir(exchange, symbol))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if self._chunks(os.path.join(directory, name)))
+
+    def _chunks(self, directory: str) -> List[str]:
+        """
+        Chunk stems in the directory, oldest first. While a chunk is being
+        compacted its original is listed until it is removed.
+        """
+        if not os.path.isdir(directory):
+            return []
+        stems = {name[:-len(CHUNK_SUFFIX)] for name in os.listdir(directory) if name.endswith(CHUNK_SUFFIX)}
+        stems = [stem for stem in stems
+                 if not (stem.endswith(COMPACTED_MARK) and stem.rstrip(COMPACTED_MARK) in stems)]
+        return sorted(stems, key=lambda stem: int(stem.rstrip(COMPACTED_MARK)))
+
+    def _read(self, read, *args):
+        """
+        Run a lock-free read, retrying when maintenance removed a chunk it
+        listed; the last attempt holds the lock.
+        """
+        for _ in range(2):
+            try:
+                return read(*args)
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            return read(*args)
+
+    def _read_index(self, path: str) -> np.ndarray:
+        """Memory-map a chunk index, ignoring a partially written last record."""
+        count = os.path.getsize(path) // INDEX_DTYPE.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(path, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+
+    def _last_timestamp(self, directory: str, chunks: List[str]) -> float:
+        if not chunks:
+            return None
+        index = self._read_index(os.path.join(directory, chunks[-1] + INDEX_SUFFIX))
+        return float(index['timestamp'][-1]) if len(index) else None
+
+    def append(self, exchange: str, data: Dict) -> bool:
+        """
+        Append one snapshot to its symbol's stream. Returns False when it was
+        dropped as older than, or too close to, the last archived frame.
+        """
+        timestamp = data.get('timestamp') or datetime.now()
+        timestamp = timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+        payload = zlib.compress(_encode_frame(data), self.compression_level)
+        directory = self._symbol_dir(exchange, data['symbol'], snapshot_stream(data))
+
+        with self._lock:
+            chunks = self._chunks(directory)
+            last = self._last_timestamp(directory, chunks)
+            if last is not None and (timestamp <= last or timestamp - last < self.min_interval_seconds):
+                return False
+            os.makedirs(directory, exist_ok=True)
+            stem = chunks[-1] if chunks else None
+            if stem is not None:
+                index = self._read_index(os.path.join(directory, stem + INDEX_SUFFIX))
+                if stem.endswith(COMPACTED_MARK) or len(index) >= self.chunk_frames:
+                    stem = None
+            if stem is None:
+                stem = f"{int(timestamp * 1000):013d}"
+
+            chunk_path = os.path.join(directory, stem + CHUNK_SUFFIX)
+            # Data is written before its index record so readers never see
+            # an index entry pointing past the end of the chunk
+            with open(chunk_path, 'ab') as chunk:
+                offset = chunk.tell()
+                chunk.write(payload)
+            record = np.array([(timestamp, offset, len(payload))], dtype=INDEX_DTYPE)
+            with open(os.path.join(directory, stem + INDEX_SUFFIX), 'ab') as index_file:
+                index_file.write(record.tobytes())
+
+            if time.time() - self._last_maintained >= self.maintain_interval_seconds:
+                self._maintain_all()
+        return True
+
+    def timestamps(self, exchange: str, symbol: str, start: float = None, end: float = None,
+                   stream: str = REALTIME_STREAM) -> np.ndarray:
+        """Epoch-second timestamps of a stream's archived frames within [start, end]."""
+        return self._read(self._timestamps, self._symbol_dir(exchange, symbol, stream), start, end)
+
+    def _timestamps(self, directory: str, start: float, end: float) -> np.ndarray:
+        found = []
+        for stem in self._chunks(directory):
+            index = self._read_index(os.path.join(directory, stem + INDEX_SUFFIX))
+            lo, hi = self._window(index, start, end)
+            found.append(np.array(index['timestamp'][lo:hi]))
+        return np.concatenate(found) if found else np.zeros(0)
+
+    def _window(self, index: np.ndarray, start: float, end: float):
+        lo = 0 if start is None else int(np.searchsorted(index['timestamp'], start, side='left'))
+        hi = len(index) if end is None else int(np.searchsorted(index['timestamp'], end, side='right'))
+        return lo, hi
+
+    def query(self, exchange: str, symbol: str, start: float = None, end: float = None,
+              stream: str = REALTIME_STREAM, max_frames: int = None) -> List[Dict]:
+        """
+        Return a stream's snapshots archived between `start` and `end` (epoch
+        seconds, inclusive), oldest first. With `max_frames`, a longer window
+        is thinned to that many evenly spaced frames (keeping the last). Only
+        the returned frames are read from disk.
+        """
+        return self._read(self._query, self._symbol_dir(exchange, symbol, stream), start, end, max_frames)
+
+    def _query(self, directory: str, start: float, end: float, max_frames: int) -> List[Dict]:
+        windows = []
+        for stem in self._chunks(directory):
+            if end is not None and int(stem.rstrip(COMPACTED_MARK)) / 1000 > end:
+                break
+            index = self._read_index(os.path.join(directory, stem + INDEX_SUFFIX))
+            lo, hi = self._window(index, start, end)
+            if lo < hi:
+                windows.append((stem, index, lo, hi))
+
+        selected = thin_positions(sum(hi - lo for _, _, lo, hi in windows), max_frames)
+        frames = []
+        position = 0
+        for stem, index, lo, hi in windows:
+            picks = selected[(selected >= position) & (selected < position + hi - lo)] - position + lo
+            position += hi - lo
+            if not len(picks):
+                continue
+            with open(os.path.join(directory, stem + CHUNK_SUFFIX), 'rb') as chunk:
+                with mmap.mmap(chunk.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    for record in index[picks]:
+                        offset, length = int(record['offset']), int(record['length'])
+                        payload = zlib.decompress(view[offset:offset + length])
+                        frames.append(_decode_frame(payload, float(record['timestamp'])))
+        return frames
+
+    def _maintain(self, directory: str) -> None:
+        """
+        Apply retention and compaction to the chunks of one stream. Judged by
+        their last frame, so a chunk still being appended to is left alone
+        and a compacted one is sealed (the next frame starts a new chunk).
+        """
+        now = time.time()
+        for stem in self._chunks(directory):
+            chunk_path = os.path.join(directory, stem + CHUNK_SUFFIX)
+            index_path = os.path.join(directory, stem + INDEX_SUFFIX)
+            index = self._read_index(index_path)
+            last = float(index['timestamp'][-1]) if len(index) else 0.0
+            del index
+
+            if self.retention_days is not None and last < now - self.retention_days * 86400:
+                os.remove(chunk_path)
+                os.remove(index_path)
+            elif (self.compact_after_hours is not None and not stem.endswith(COMPACTED_MARK)
+                  and last < now - self.compact_after_hours * 3600):
+                self._compact_chunk(directory, stem)
+
+    def _compact_chunk(self, directory: str, stem: str) -> None:
+        """Rewrite a sealed chunk keeping at most one frame per compaction interval."""
+        index = self._read_index(os.path.join(directory, stem + INDEX_SUFFIX))
+        keep = []
+        last_kept = None
+        for i, timestamp in enumerate(index['timestamp']):
+            if last_kept is None or timestamp - last_kept >= self.compact_interval_seconds:
+                keep.append(i)
+                last_kept = timestamp
+
+        compacted = stem + COMPACTED_MARK
+        records = np.zeros(len(keep), dtype=INDEX_DTYPE)
+        with open(os.path.join(directory, stem + CHUNK_SUFFIX), 'rb') as source, \
+                open(os.path.join(directory, compacted + CHUNK_SUFFIX), 'wb') as target:
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for n, i in enumerate(keep):
+                    offset, length = int(index[i]['offset']), int(index[i]['length'])
+                    records[n] = (index[i]['timestamp'], target.tell(), length)
+                    target.write(view[offset:offset + length])
+        del index
+        records.tofile(os.path.join(directory, compacted + INDEX_SUFFIX))
+
+        os.remove(os.path.join(directory, stem + CHUNK_SUFFIX))
+        os.remove(os.path.join(directory, stem + INDEX_SUFFIX))
+
+    def maintain(self) -> None:
+        """Apply retention and compaction across every archived stream."""
+        with self._lock:
+            self._maintain_all()
+
+    def _maintain_all(self) -> None:
+        self._last_maintained = time.time()
+        if not os.path.isdir(self.root):
+            return
+        for directory, _, files in os.walk(self.root):
+            if any(name.endswith(CHUNK_SUFFIX) for name in files):
+                self._maintain(directory)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> SnapshotArchive:
+    """Return the process-wide archive, rooted at $LIQ_ARCHIVE_DIR if set."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = SnapshotArchive(os.environ.get('LIQ_ARCHIVE_DIR', 'data/archive'))
+        return _archive
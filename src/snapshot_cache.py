@@ -0,0 +1,137 @@
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from heatmap_codec import HeatmapStreamEncoder
+
+
+# Resources published for every snapshot
+RESOURCES = ('heatmap', 'levels', 'leverage')
+
+
+def heatmap_to_grid(heatmap_df: pd.DataFrame, timestamp: datetime,
+                    column: str = 'total_liquidation_volume') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Arrange heatmap rows as a (price x time) grid.
+
+    Historical heatmaps hold one row per (timestamp, price); real-time
+    heatmaps hold one row per price and become a single time column at the
+    snapshot timestamp. Returns (price_axis, time_axis_ms, matrix).
+    """
+    if 'timestamp' in heatmap_df.columns:
+        grid = heatmap_df.pivot_table(index='price', columns='timestamp', values=column, aggfunc='sum')
+        times = grid.columns.values.astype('datetime64[ms]').astype(np.int64)
+        return grid.index.values, times, grid.values
+    times = np.array([int(timestamp.timestamp() * 1000)], dtype=np.int64)
+    return heatmap_df['price'].values, times, heatmap_df[[column]].values
+
+
+def leverage_distribution(liquidation_levels: Dict) -> List[Dict]:
+    """One row per leverage pairing its long and short liquidation levels."""
+    shorts = {liq['leverage']: liq for liq in liquidation_levels['short_liquidations']}
+    rows = []
+    for long_liq in liquidation_levels['long_liquidations']:
+        short_liq = shorts.get(long_liq['leverage'], {})
+        rows.append({
+            'leverage': long_liq['leverage'],
+            'risk_level': long_liq.get('risk_level'),
+            'long_price': long_liq['price'],
+            'long_distance_percent': long_liq['distance_percent'],
+            'short_price': short_liq.get('price'),
+            'short_distance_percent': short_liq.get('distance_percent')
+        })
+    return rows
+
+
+class CachedSnapshot:
+    def __init__(self, exchange: str, symbol: str, version: int, data: Dict):
+        """
+        One published snapshot with every resource pre-serialized, both plain
+        and gzip-compressed, so serving it never recomputes anything.
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self.version = version
+        self.data = data
+        timestamp = data.get('timestamp') or datetime.now()
+        self.last_modified = timestamp.timestamp()
+
+        prices, times, matrix = heatmap_to_grid(data['heatmap_data'], timestamp)
+        self.grid = (prices, times, matrix)
+        # Binary frames are filled in by the cache, which knows the previous version
+        self.binary = {'keyframe': None, 'delta': None, 'base': None}
+        base = {
+            'exchange': exchange,
+            'symbol': symbol,
+            'version': version,
+            'timestamp': timestamp.isoformat(),
+            'current_price': data['current_price'],
+            'analysis_type': data.get('analysis_type', 'real-time')
+        }
+        payloads = {
+            'heatmap': dict(base, price=prices.tolist(), time=times.tolist(), intensity=matrix.tolist()),
+            'levels': dict(base, liquidation_levels=data['liquidation_levels']),
+            'leverage': dict(base, leverage=leverage_distribution(data['liquidation_levels']))
+        }
+        self.bodies = {}
+        for resource, payload in payloads.items():
+            body = json.dumps(payload, default=float, separators=(',', ':')).encode()
+            self.bodies[resource] = {
+                'identity': body,
+                'gzip': gzip.compress(body, compresslevel=6)
+            }
+
+    def etag(self, encoding: str = 'identity') -> str:
+        suffix = '-gz' if encoding == 'gzip' else ''
+        return f'"{self.exchange}:{self.symbol}:{self.version}{suffix}"'
+
+
+class SnapshotCache:
+    def __init__(self):
+        """Latest snapshot per (exchange, symbol), shared by all request threads."""
+        self._snapshots: Dict[Tuple[str, str], CachedSnapshot] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._encoders: Dict[Tuple[str, str], HeatmapStreamEncoder] = {}
+        self._lock = threading.Lock()
+
+    def put(self, exchange: str, symbol: str, data: Dict) -> CachedSnapshot:
+        """Publish a new snapshot version; serialization happens once here."""
+        key = (exchange, symbol)
+        with self._lock:
+            # Versions follow the wall clock (in seconds) so a restarted process
+            # continues above the previous one's versions and ETags never repeat
+            version = max(self._versions.get(key, 0) + 1, int(time.time()))
+            self._versions[key] = version
+        snapshot = CachedSnapshot(exchange, symbol, version, data)
+        with self._lock:
+            current = self._snapshots.get(key)
+            if current is None or current.version < version:
+                self._encode_binary(key, snapshot)
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    def _encode_binary(self, key: Tuple[str, str], snapshot: CachedSnapshot) -> None:
+        """Encode the binary keyframe and the delta against the previous version."""
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = HeatmapStreamEncoder()
+            self._encoders[key] = encoder
+        base = encoder.seq
+        prices, times, matrix = snapshot.grid
+        keyframe, delta = encoder.encode(snapshot.version, prices, times, matrix,
+                                         snapshot.data['current_price'],
+                                         int(snapshot.last_modified * 1000))
+        snapshot.binary = {'keyframe': keyframe, 'delta': delta, 'base': base if delta else None}
+
+    def get(self, exchange: str, symbol: str) -> CachedSnapshot:
+        return self._snapshots.get((exchange, symbol))
+
+    def snapshots(self) -> List[CachedSnapshot]:
+        with self._lock:
+            return list(self._snapshots.values())
@@ -0,0 +1,123 @@
+// Browser decoder for the binary heatmap frames served at
+// /v1/<exchange>/<symbol>/heatmap.bin (see src/heatmap_codec.py).
+//
+// Usage with Plotly.js:
+//   const stream = new HeatmapStream('/v1/binance/BTC-USDT/heatmap.bin', 'chart');
+//   stream.start(5000);
+
+const KEYFRAME = 0x01, UINT16 = 0x02, COMPRESSED = 0x04, AXES = 0x08,
+      LINEAR_AXES = 0x10, LOG_SCALE = 0x20;
+const HEADER_SIZE = 46;
+
+function linspace(start, stop, n) {
+  if (n === 1) return [start];
+  const step = (stop - start) / (n - 1);
+  return Array.from({length: n}, (_, i) => start + i * step);
+}
+
+async function inflate(bytes) {
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+class HeatmapStreamDecoder {
+  constructor() {
+    this.seq = null;
+    this.frame = null;
+  }
+
+  async decode(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'LHMF' || view.getUint8(4) !== 1) throw new Error('Not a heatmap frame');
+    const flags = view.getUint8(5);
+    const seq = view.getUint32(6, true), baseSeq = view.getUint32(10, true);
+    const rows = view.getUint32(14, true), cols = view.getUint32(18, true);
+    const scale = view.getFloat64(22, true);
+    const currentPrice = view.getFloat64(30, true);
+    const timestampMs = Number(view.getBigInt64(38, true));
+    let offset = HEADER_SIZE;
+
+    let base = null;
+    if (!(flags & KEYFRAME)) {
+      if (this.frame === null || this.seq !== baseSeq) {
+        throw new Error(`Delta frame ${seq} needs base ${baseSeq}, decoder holds ${this.seq}`);
+      }
+      base = this.frame;
+    }
+
+    let prices, times;
+    if (flags & AXES) {
+      if (flags & LINEAR_AXES) {
+        prices = linspace(view.getFloat64(offset, true), view.getFloat64(offset + 8, true), rows);
+        times = linspace(Number(view.getBigInt64(offset + 16, true)),
+                         Number(view.getBigInt64(offset + 24, true)), cols).map(Math.round);
+        offset += 32;
+      } else {
+        prices = Array.from(new Float64Array(buffer.slice(offset, offset + rows * 8)));
+        offset += rows * 8;
+        times = Array.from(new BigInt64Array(buffer.slice(offset, offset + cols * 8)), Number);
+        offset += cols * 8;
+      }
+    } else {
+      prices = base.prices;
+      times = base.times;
+    }
+
+    let payload = new Uint8Array(buffer.slice(offset));
+    if (flags & COMPRESSED) payload = await inflate(payload);
+    let codes = (flags & UINT16) ? new Uint16Array(payload.buffer) : payload;
+    if (base !== null) codes = codes.map((code, i) => code ^ base.codes[i]);
+
+    this.frame = {prices, times, codes};
+    this.seq = seq;
+
+    // Rebuild the price x time intensity grid in the layout Plotly expects (z[row][col])
+    const z = [];
+    for (let r = 0; r < rows; r++) {
+      const row = new Array(cols);
+      for (let c = 0; c < cols; c++) {
+        const value = codes[r * cols + c] * scale;
+        row[c] = (flags & LOG_SCALE) ? Math.expm1(value) : value;
+      }
+      z.push(row);
+    }
+    return {seq, prices, times: times.map(t => new Date(t)), z, currentPrice, timestampMs};
+  }
+}
+
+class HeatmapStream {
+  constructor(url, element) {
+    this.url = url;
+    this.element = element;
+    this.decoder = new HeatmapStreamDecoder();
+  }
+
+  async poll() {
+    const since = this.decoder.seq === null ? '' : `?since=${this.decoder.seq}`;
+    const response = await fetch(this.url + since);
+    if (response.status === 304) return;
+    const frame = await this.decoder.decode(await response.arrayBuffer());
+    Plotly.react(this.element, [{
+      type: 'heatmap',
+      x: frame.times,
+      y: frame.prices,
+      z: frame.z.map(row => row.map(Math.log1p)),
+      colorscale: 'Hot'
+    }], {
+      title: `Liquidation Heatmap (v${frame.seq})`,
+      plot_bgcolor: 'black',
+      paper_bgcolor: '#0d1117',
+      font: {color: 'white'}
+    });
+  }
+
+  start(intervalMs = 5000) {
+    const tick = () => this.poll().catch(err => {
+      console.error(err);
+      this.decoder = new HeatmapStreamDecoder();  // resync from a keyframe
+    });
+    tick();
+    return setInterval(tick, intervalMs);
+  }
+}
@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+# Default depth tiers, shallowest first: levels to request and refresh interval (seconds)
+DEFAULT_DEPTH_TIERS = [
+    {'limit': 100, 'interval': 5},
+    {'limit': 1000, 'interval': 120}
+]
+
+# A tier is reported stale once its age exceeds this multiple of its interval
+STALE_FACTOR = 2.0
+
+
+class TieredOrderBook:
+    def __init__(self, tiers: List[Dict] = None):
+        """
+        Order book kept as several depth tiers refreshed at different rates.
+
+        The shallow tier near the current price is refreshed often; deeper
+        tiers, whose tails change slowly, are refreshed rarely. Books are
+        shared per (exchange, symbol), so each caller refreshes through its
+        own fetch function (its exchange and request priority).
+        """
+        self.tiers = sorted(tiers or DEFAULT_DEPTH_TIERS, key=lambda tier: tier['limit'])
+        self._books: List[Dict] = [None] * len(self.tiers)
+        self._fetched_at: List[float] = [0.0] * len(self.tiers)
+        self._lock = threading.Lock()
+
+    def adopt(self, other: 'TieredOrderBook') -> None:
+        """Take over the cached books of `other`'s tiers that have the same depth."""
+        with other._lock:
+            fetched = {tier['limit']: (other._books[i], other._fetched_at[i])
+                       for i, tier in enumerate(other.tiers) if other._books[i] is not None}
+        with self._lock:
+            for i, tier in enumerate(self.tiers):
+                if tier['limit'] in fetched:
+                    self._books[i], self._fetched_at[i] = fetched[tier['limit']]
+
+    def refresh(self, fetch: Callable[[int], Dict], force: bool = False) -> None:
+        """
+        Refetch every tier whose interval has elapsed; `fetch(limit)` returns
+        a ccxt order book with `limit` levels.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for i, tier in enumerate(self.tiers):
+                if not force and self._books[i] is not None and now - self._fetched_at[i] < tier['interval']:
+                    continue
+                book = fetch(tier['limit'])
+                if book:
+                    self._books[i] = book
+                    self._fetched_at[i] = time.monotonic()
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the cached tiers (a level is ~120 bytes as Python lists)."""
+        levels = sum(len(book['bids']) + len(book['asks']) for book in self._books if book is not None)
+        return levels * 120
+
+    def staleness(self) -> List[Dict]:
+        """Age of each tier and whether it is past its refresh budget."""
+        now = time.monotonic()
+        report = []
+        for i, tier in enumerate(self.tiers):
+            age = now - self._fetched_at[i] if self._books[i] is not None else None
+            report.append({
+                'limit': tier['limit'],
+                'interval': tier['interval'],
+                'age': age,
+                'stale': age is None or age > tier['interval'] * STALE_FACTOR
+            })
+        return report
+
+    def snapshot(self) -> Dict:
+        """
+        Merge the tiers into one book.
+
+        The freshest (shallowest) tier is taken as-is; each deeper tier only
+        contributes bids below and asks above the levels already covered, so
+        stale deep levels never override fresher ones near the price.
+        """
+        with self._lock:
+            books = [book for book in self._books if book is not None]
+            if not books:
+                return None
+
+            base = books[0]
+            bids = [list(level[:2]) for level in base['bids']]
+            asks = [list(level[:2]) for level in base['asks']]
+            for book in books[1:]:
+                if bids:
+                    floor = bids[-1][0]
+                    bids.extend(list(level[:2]) for level in book['bids'] if level[0] < floor)
+                else:
+                    bids = [list(level[:2]) for level in book['bids']]
+                if asks:
+                    ceiling = asks[-1][0]
+                    asks.extend(list(level[:2]) for level in book['asks'] if level[0] > ceiling)
+                else:
+                    asks = [list(level[:2]) for level in book['asks']]
+
+            return {
+                'symbol': base.get('symbol'),
+                'bids': bids,
+                'asks': asks,
+                'timestamp': base.get('timestamp'),
+                'datetime': base.get('datetime'),
+                'nonce': base.get('nonce'),
+                'tiers': self.staleness()
+            }
+
+
+_books: Dict[Tuple[str, str], TieredOrderBook] = {}
+_books_lock = threading.Lock()
+
+
+def get_tiered_book(exchange_id: str, symbol: str, tiers: List[Dict] = None) -> TieredOrderBook:
+    """
+    Return the process-wide tiered book for (exchange, symbol). A book built
+    with different tiers is rebuilt with these, keeping tiers of equal depth.
+    """
+    key = (exchange_id, symbol)
+    tiers = sorted(tiers or DEFAULT_DEPTH_TIERS, key=lambda tier: tier['limit'])
+    with _books_lock:
+        book = _books.get(key)
+        if book is None or book.tiers != tiers:
+            previous = book
+            book = TieredOrderBook(tiers)
+            if previous is not None:
+                book.adopt(previous)
+            _books[key] = book
+        return book
+
+
+def tiered_books_nbytes() -> int:
+    """Approximate memory held by every tiered book in this process."""
+    with _books_lock:
+        return sum(book.nbytes() for book in _books.values())
+
+
+def clear_tiered_books() -> None:
+    """Drop all cached tiers; they are refetched on next use."""
+    with _books_lock:
+        _books.clear()
@@ -38,18 +38,11 @@ class LiquidationHeatmapVisualizer:
         time_steps = 50
         time_range = pd.date_range(end=datetime.now(), periods=time_steps, freq='5min')
         
-        # Create 2D heatmap data (price x time)
-        heatmap_matrix = np.zeros((len(price_range), time_steps))
-        
-        # Fill heatmap with liquidation intensity
-        for i, price in enumerate(price_range):
-            # Base intensity from order book
-            base_intensity = heatmap_df.iloc[i]['total_liquidation_volume']
-            
-            # Add time-based variation (simulate changing market conditions)
-            for j in range(time_steps):
-                variation = np.random.normal(1, 0.1)
-                heatmap_matrix[i, j] = base_intensity * variation
+        # Create 2D heatmap data (price x time): base intensity from order book
+        # with time-based variation (simulate changing market conditions)
+        base_intensity = heatmap_df['total_liquidation_volume'].values
+        variation = np.random.normal(1, 0.1, size=(len(price_range), time_steps))
+        heatmap_matrix = base_intensity[:, None] * variation
         
         # Normalize for better visualization
         heatmap_matrix = np.log1p(heatmap_matrix)
@@ -311,4 +304,92 @@ class LiquidationHeatmapVisualizer:
         fig.update_yaxes(title_text="Price ($)", row=1, col=1, gridcolor='#333')
         fig.update_yaxes(title_text="Distance (%)", row=1, col=2, gridcolor='#333')
         
-        return fig
\ No newline at end of file
+        return fig
+    
+    def create_replay_heatmap(self, frames: list) -> go.Figure:
+        """Show how liquidation clusters built up across archived snapshots."""
+        # Collapse each snapshot to a price profile (historical frames hold a time x price grid)
+        profiles = []
+        for frame in frames:
+            heatmap_df = frame['heatmap_data']
+            if 'timestamp' in heatmap_df.columns:
+                heatmap_df = heatmap_df.groupby('price', as_index=False)['total_liquidation_volume'].sum()
+            profiles.append((heatmap_df['price'].values, heatmap_df['total_liquidation_volume'].values))
+        
+        # Resample every profile onto a shared price grid
+        price_min = min(prices.min() for prices, _ in profiles)
+        price_max = max(prices.max() for prices, _ in profiles)
+        price_grid = np.linspace(price_min, price_max, 100)
+        heatmap_matrix = np.column_stack([
+            np.interp(price_grid, prices, volumes, left=0, right=0) for prices, volumes in profiles
+        ])
+        heatmap_matrix = np.log1p(heatmap_matrix)
+        
+        time_range = [frame['timestamp'] for frame in frames]
+        
+        fig = go.Figure()
+        fig.add_trace(
+            go.Heatmap(
+                z=heatmap_matrix,
+                x=time_range,
+                y=price_grid,
+                colorscale='Hot',
+                colorbar=dict(title="Liquidation<br>Intensity"),
+                hovertemplate='Price: $%{y:,.2f}<br>' +
+                             'Time: %{x}<br>' +
+                             'Intensity: %{z:.2f}<extra></extra>'
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=time_range,
+                y=[frame['current_price'] for frame in frames],
+                mode='lines',
+                name='Price',
+                line=dict(color='yellow', width=2)
+            )
+        )
+        
+        fig.update_layout(
+            title=f"Liquidation Build-up - {frames[-1]['symbol']}",
+            height=600,
+            plot_bgcolor='black',
+            paper_bgcolor='#0d1117',
+            font=dict(color='white'),
+            hovermode='closest'
+        )
+        fig.update_xaxes(title_text="Time", gridcolor='#333')
+        fig.update_yaxes(title_text="Price ($)", gridcolor='#333')
+        
+        return fig
+    
+    def create_stream_heatmap(self, frame: dict, symbol: str = '') -> go.Figure:
+        """Plot a frame decoded by HeatmapStreamDecoder."""
+        time_range = pd.to_datetime(frame['time'], unit='ms')
+        
+        fig = go.Figure()
+        fig.add_trace(
+            go.Heatmap(
+                z=np.log1p(frame['intensity']),
+                x=time_range,
+                y=frame['price'],
+                colorscale='Hot',
+                colorbar=dict(title="Liquidation<br>Intensity"),
+                hovertemplate='Price: $%{y:,.2f}<br>' +
+                             'Time: %{x}<br>' +
+                             'Intensity: %{z:.2f}<extra></extra>'
+            )
+        )
+        fig.add_hline(y=frame['current_price'], line=dict(color='yellow', width=2, dash='dash'))
+        
+        fig.update_layout(
+            title=f"Liquidation Heatmap - {symbol} (v{frame['seq']})",
+            height=600,
+            plot_bgcolor='black',
+            paper_bgcolor='#0d1117',
+            font=dict(color='white')
+        )
+        fig.update_xaxes(title_text="Time", gridcolor='#333')
+        fig.update_yaxes(title_text="Price ($)", gridcolor='#333')
+        
+        return fig
@@ -0,0 +1,182 @@
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Tuple
+
+# The Docker healthcheck imports this module every few seconds: keep it
+# free of numpy/pandas at import time
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+READY_FILE = 'ready'
+WARMING_FILE = 'warming'
+
+# A ready marker older than this means the warm-up loop stopped refreshing
+DEFAULT_READY_MAX_AGE_SECONDS = 600
+
+
+def _safe_name(name: str) -> str:
+    """'BTC/USDT:USDT' -> 'BTC-USDT-USDT'"""
+    return re.sub(r'[^A-Za-z0-9._]+', '-', str(name)).strip('-')
+
+
+class WarmStore:
+    def __init__(self, root: str = 'data/warm'):
+        """
+        On-disk snapshot of what a cold process would otherwise fetch and
+        compute on its first requests: exchange markets, recent candles and
+        the latest heatmaps, plus warming/ready markers kept by the warm-up
+        loop. Files are replaced atomically, so readers never see partial
+        writes.
+        """
+        self.root = root
+        # Loaded heatmaps by path, reused while the file is unchanged
+        self._loaded: Dict[str, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _write(self, path: str, payload: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    # Markets
+
+    def save_markets(self, exchange: str, markets: Dict) -> None:
+        self._write(self._path('markets', f"{_safe_name(exchange)}.json"), json.dumps(markets, default=str).encode())
+
+    def load_markets(self, exchange: str, max_age: float = None) -> Dict:
+        """Saved markets for an exchange, or None if missing or older than `max_age` seconds."""
+        path = self._path('markets', f"{_safe_name(exchange)}.json")
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Error loading saved markets for {exchange}: {e}")
+            return None
+
+    # Candles
+
+    def _candles_path(self, exchange: str, symbol: str, timeframe: str) -> str:
+        return self._path('candles', _safe_name(exchange), f"{_safe_name(symbol)}_{timeframe}.pkl")
+
+    def save_candles(self, exchange: str, symbol: str, timeframe: str, ohlcv: 'pd.DataFrame') -> None:
+        self._write(self._candles_path(exchange, symbol, timeframe),
+                    pickle.dumps(ohlcv, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load_candles(self, exchange: str, symbol: str, timeframe: str) -> 'pd.DataFrame':
+        try:
+            with open(self._candles_path(exchange, symbol, timeframe), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading saved candles for {symbol}: {e}")
+            return None
+
+    # Heatmaps
+
+    def _heatmap_path(self, exchange: str, symbol: str, mode: str, timeframe: str, duration_minutes: int) -> str:
+        name = f"{_safe_name(symbol)}_{_safe_name(mode)}_{_safe_name(timeframe)}_{int(duration_minutes)}.pkl"
+        return self._path('heatmaps', _safe_name(exchange), name)
+
+    def save_heatmap(self, exchange: str, symbol: str, mode: str, timeframe: str,
+                     duration_minutes: int, data: Dict) -> None:
+        self._write(self._heatmap_path(exchange, symbol, mode, timeframe, duration_minutes),
+                    pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def heatmap_age(self, exchange: str, symbol: str, mode: str, timeframe: str, duration_minutes: int) -> float:
+        """Seconds since the heatmap was saved, or None if there is none."""
+        try:
+            return time.time() - os.path.getmtime(
+                self._heatmap_path(exchange, symbol, mode, timeframe, duration_minutes))
+        except OSError:
+            return None
+
+    def load_heatmap(self, exchange: str, symbol: str, mode: str, timeframe: str, duration_minutes: int) -> Dict:
+        """Latest saved heatmap data (shared between callers; do not modify), or None."""
+        path = self._heatmap_path(exchange, symbol, mode, timeframe, duration_minutes)
+        try:
+            mtime = os.path.getmtime(path)
+            with self._lock:
+                loaded = self._loaded.get(path)
+            if loaded is not None and loaded[0] == mtime:
+                return loaded[1]
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading saved heatmap for {symbol}: {e}")
+            return None
+        with self._lock:
+            self._loaded[path] = (mtime, data)
+        return data
+
+    def nbytes(self) -> int:
+        from memory_budget import estimate_size
+
+        with self._lock:
+            return sum(estimate_size(data) for _, data in self._loaded.values())
+
+    def clear_loaded(self) -> None:
+        with self._lock:
+            self._loaded.clear()
+
+    # Readiness
+
+    def _touch(self, name: str, details: Dict = None) -> None:
+        self._write(self._path(name), json.dumps(dict(details or {}, at=time.time())).encode())
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def _fresh(self, name: str, max_age: float = None) -> bool:
+        try:
+            age = time.time() - os.path.getmtime(self._path(name))
+        except OSError:
+            return False
+        return max_age is None or age <= max_age
+
+    def mark_warming(self) -> None:
+        """A warm-up started: saved snapshots may be old but fresh ones are on the way."""
+        self._remove(READY_FILE)
+        self._touch(WARMING_FILE)
+
+    def mark_ready(self, details: Dict = None) -> None:
+        """A warm-up pass completed; called again after every pass."""
+        self._touch(READY_FILE, details)
+        self._remove(WARMING_FILE)
+
+    def is_warming(self, max_age: float = DEFAULT_READY_MAX_AGE_SECONDS) -> bool:
+        return self._fresh(WARMING_FILE, max_age)
+
+    def is_ready(self, max_age: float = DEFAULT_READY_MAX_AGE_SECONDS) -> bool:
+        """True once a warm-up pass completed since boot, and again within `max_age` seconds."""
+        return self._fresh(READY_FILE, max_age)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_warm_store() -> WarmStore:
+    """Return the process-wide warm store, rooted at $LIQ_WARM_DIR if set."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WarmStore(os.environ.get('LIQ_WARM_DIR', 'data/warm'))
+        return _store
@@ -0,0 +1,173 @@
+import argparse
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+# This module is __main__ in --serve mode, so the compute pool's spawned
+# workers re-import everything imported here: keep it to what they need
+from compute_pool import HISTORICAL, REALTIME, get_compute_pool
+from data_fetcher import HISTORICAL_PERIODS, LiquidationDataFetcher
+from pairs import DEFAULT_PAIRS, parse_pairs
+from request_scheduler import BACKGROUND
+from snapshot_archive import get_archive
+from warm_store import WarmStore, get_warm_store
+
+
+DEFAULT_WARM_PAIRS = DEFAULT_PAIRS
+DEFAULT_WARM_REFRESH_SECONDS = 30
+
+# The views the app opens with: a real-time snapshot and its default historical period
+_, DEFAULT_PERIOD_KEY, DEFAULT_PERIOD_MINUTES = HISTORICAL_PERIODS[1]
+DEFAULT_WARM_VIEWS = [
+    (REALTIME, 'current', 0),
+    (HISTORICAL, DEFAULT_PERIOD_KEY, DEFAULT_PERIOD_MINUTES),
+]
+
+# Imported before the first visitor so their first page load doesn't pay for it
+PRELOAD_MODULES = [
+    'pandas', 'numpy', 'ccxt', 'plotly.graph_objects', 'plotly.express', 'plotly.subplots',
+    'matplotlib.pyplot', 'seaborn', 'visualizer', 'snapshot_archive', 'memory_budget'
+]
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+
+
+def preload_modules() -> None:
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ Could not preload {name}: {e}")
+
+
+class WarmUp:
+    def __init__(self, pairs: List[Tuple[str, str]], store: WarmStore = None,
+                 refresh_seconds: float = DEFAULT_WARM_REFRESH_SECONDS, views: List[Tuple] = None):
+        """
+        Keeps the warm store current for the given (exchange, symbol) pairs.
+
+        Each pass loads markets, fetches candles (incrementally, from the
+        saved ones) and computes the app's default heatmaps on the shared
+        compute pool, saving everything to the store and appending the
+        heatmaps to the snapshot archive. The store is marked warming on start
+        and ready after every pass that saved heatmaps. Errors are logged and
+        never end the loop.
+        """
+        self.pairs = pairs
+        self.store = store or get_warm_store()
+        self.refresh_seconds = refresh_seconds
+        self.views = views or DEFAULT_WARM_VIEWS
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _warm(self, exchange: str, symbol: str, mode: str, timeframe: str, duration_minutes: int) -> bool:
+        try:
+            fetcher = LiquidationDataFetcher(exchange, priority=BACKGROUND, tiered_depth=True,
+                                             warm_store=self.store)
+            data = get_compute_pool().compute(fetcher, symbol, mode, timeframe, duration_minutes)
+        except Exception as e:
+            print(f"Error warming {symbol} {mode} on {exchange}: {e}")
+            return False
+        if not data:
+            return False
+        try:
+            self.store.save_heatmap(exchange, symbol, mode, timeframe, duration_minutes, data)
+        except OSError as e:
+            print(f"Error saving warm heatmap for {symbol} {mode}: {e}")
+            return False
+        # Sessions served this snapshot don't archive it, so the warm-up does
+        try:
+            get_archive().append(exchange, data)
+        except Exception as e:
+            print(f"Error archiving warm snapshot for {symbol}: {e}")
+        return True
+
+    def run_once(self) -> int:
+        """Warm every pair and view once; returns the number of heatmaps saved."""
+        jobs = [(exchange, symbol) + view for exchange, symbol in self.pairs for view in self.views]
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix='warmup') as pool:
+            return sum(pool.map(lambda job: self._warm(*job), jobs))
+
+    def _mark(self, ready: bool, details: Dict = None) -> None:
+        try:
+            if ready:
+                self.store.mark_ready(details)
+            else:
+                self.store.mark_warming()
+        except OSError as e:
+            print(f"Error writing warm-up marker under {self.store.root}: {e}")
+
+    def run_forever(self) -> None:
+        self._mark(ready=False)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                saved = self.run_once()
+            except Exception as e:
+                print(f"Error in warm-up pass: {e}")
+                saved = 0
+            if saved:
+                self._mark(ready=True, details={'pairs': len(self.pairs), 'heatmaps': saved})
+                print(f"🔥 Warm snapshot updated: {saved} heatmaps in {time.monotonic() - started:.1f}s")
+            else:
+                print("⚠️ Warm-up pass saved no heatmaps, retrying")
+            self._stop.wait(max(0.0, self.refresh_seconds - (time.monotonic() - started)))
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self.run_forever, name='warmup', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def create_warmup() -> WarmUp:
+    """Warm-up configured from LIQ_WARM_PAIRS / LIQ_WARM_REFRESH_SECONDS."""
+    return WarmUp(
+        parse_pairs(os.environ.get('LIQ_WARM_PAIRS', DEFAULT_WARM_PAIRS)),
+        refresh_seconds=float(os.environ.get('LIQ_WARM_REFRESH_SECONDS', DEFAULT_WARM_REFRESH_SECONDS))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Warm the on-disk snapshot of markets, candles and heatmaps',
+        epilog='Extra arguments with --serve are passed to `streamlit run`, e.g. --server.port=8501'
+    )
+    parser.add_argument('--serve', action='store_true',
+                       help='Run the Streamlit app in this process with the warm-up in the background')
+    parser.add_argument('--once', action='store_true',
+                       help='Run a single warm-up pass and exit')
+
+    args, streamlit_args = parser.parse_known_args()
+
+    warmup = create_warmup()
+    if args.once:
+        warmup._mark(ready=False)
+        saved = warmup.run_once()
+        if saved:
+            warmup._mark(ready=True, details={'pairs': len(warmup.pairs), 'heatmaps': saved})
+        print(f"🔥 Warm-up saved {saved} heatmaps")
+        sys.exit(0 if saved else 1)
+
+    if not args.serve:
+        warmup.run_forever()
+        return
+
+    from streamlit.web import cli as streamlit_cli
+
+    # Streamlit runs its scripts in this process, so modules imported and
+    # caches filled here are already warm for the first session
+    preload_modules()
+    warmup.start()
+    sys.argv = ['streamlit', 'run', APP_PATH] + streamlit_args
+    sys.exit(streamlit_cli.main())
+
+
+if __name__ == "__main__":
+    main()
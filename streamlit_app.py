@@ -1,18 +1,46 @@
 import streamlit as st
 import sys
 import os
+import time
+from datetime import datetime
 sys.path.append('src')
 
-from data_fetcher import LiquidationDataFetcher
+from data_fetcher import LiquidationDataFetcher, HISTORICAL_PERIODS
 from visualizer import LiquidationHeatmapVisualizer
+from request_scheduler import get_scheduler
+from snapshot_archive import REALTIME_STREAM, get_archive, thin_positions
+from compute_pool import HISTORICAL, REALTIME, get_compute_pool
+from memory_budget import get_tracker
+from tiered_order_book import tiered_books_nbytes, clear_tiered_books
+from warm_store import get_warm_store
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import plotly.graph_objects as go
 
+# Most frames the replay build-up chart decodes, and snapshots the replay slider offers
+REPLAY_CHART_FRAMES = 120
+REPLAY_SLIDER_OPTIONS = 1000
+
 st.set_page_config(
     page_title="Crypto Liquidation Heatmap",
     page_icon="📊",
     layout="wide"
 )
 
+
+@st.cache_resource
+def get_memory_tracker():
+    """Memory tracker with the shared caches registered for eviction."""
+    tracker = get_tracker()
+    tracker.register_cache('tiered_order_books', tiered_books_nbytes, clear_tiered_books)
+    tracker.register_cache('warm_snapshots', get_warm_store().nbytes, get_warm_store().clear_loaded)
+    return tracker
+
+
+memory_tracker = get_memory_tracker()
+warm_store = get_warm_store()
+script_ctx = get_script_run_ctx()
+session_id = script_ctx.session_id if script_ctx else 'local'
+
 st.title("🔥 Cryptocurrency Liquidation Heatmap")
 st.caption("Real-time liquidation analysis similar to Coinglass")
 
@@ -34,19 +62,14 @@ with st.sidebar:
     st.subheader("📊 Analysis Period")
     duration_type = st.radio(
         "Duration Type",
-        ["Real-time Snapshot", "Historical Analysis"],
+        ["Real-time Snapshot", "Historical Analysis", "Replay Archive"],
         index=0
     )
     
     if duration_type == "Historical Analysis":
         time_period = st.selectbox(
             "Time Period",
-            [
-                ("12 Hours", "12h", 720),
-                ("24 Hours", "1d", 1440),
-                ("2 Days", "2d", 2880),
-                ("3 Days", "3d", 4320)
-            ],
+            HISTORICAL_PERIODS,
             index=1,
             format_func=lambda x: x[0]
         )
@@ -54,6 +77,33 @@ with st.sidebar:
         analysis_minutes = time_period[2]
         
         st.info(f"📈 Analyzing liquidations over {time_period[0]}")
+    elif duration_type == "Replay Archive":
+        replay_hours = st.selectbox(
+            "Replay Window",
+            [1, 6, 24, 72, 168],
+            index=2,
+            format_func=lambda x: f"{x} hour{'s' if x > 1 else ''}" if x < 24 else f"{x//24} day{'s' if x//24 > 1 else ''}"
+        )
+        replay_streams = get_archive().streams(exchange, symbol) or [REALTIME_STREAM]
+        replay_stream = st.selectbox(
+            "Analysis",
+            replay_streams,
+            index=replay_streams.index(REALTIME_STREAM) if REALTIME_STREAM in replay_streams else 0
+        )
+        replay_start = time.time() - replay_hours * 3600
+        archived_times = get_archive().timestamps(exchange, symbol, start=replay_start, stream=replay_stream)
+        if len(archived_times):
+            replay_at = st.select_slider(
+                "Snapshot",
+                options=archived_times[thin_positions(len(archived_times), REPLAY_SLIDER_OPTIONS)].tolist(),
+                value=float(archived_times[-1]),
+                format_func=lambda ts: datetime.fromtimestamp(ts).strftime("%m-%d %H:%M:%S")
+            )
+        else:
+            replay_at = None
+        selected_timeframe = "replay"
+        analysis_minutes = 0
+        st.info(f"⏪ Replaying {len(archived_times)} archived snapshots (no network calls)")
     else:
         selected_timeframe = "current"
         analysis_minutes = 0
@@ -76,27 +126,99 @@ with st.sidebar:
     
     if st.button("🔄 Refresh Data"):
         st.rerun()
+    
+    with st.expander("🚦 Request Scheduler"):
+        scheduler_metrics = get_scheduler().metrics()
+        st.write("Queue depth", scheduler_metrics['queue_depth'])
+        st.write("Wait time (s)", {
+            name: round(stats['p95'], 3) for name, stats in scheduler_metrics['wait_seconds'].items()
+        })
+        st.caption(f"Completed {scheduler_metrics['completed']} • Retried {scheduler_metrics['retried']} • "
+                   f"Backoffs {scheduler_metrics['backoffs']}")
+    
+    with st.expander("🧠 Memory"):
+        memory_report = memory_tracker.report()
+        st.caption(f"RSS {memory_report['rss_bytes'] / 1e6:.0f} of {memory_report['rss_budget_bytes'] / 1e6:.0f} MB • "
+                   f"Tracked {memory_report['tracked_bytes'] / 1e6:.1f} MB of {memory_report['global_budget_bytes'] / 1e6:.0f} MB • "
+                   f"Evictions {memory_report['evictions']}")
+        st.dataframe([
+            {"Holder": holder['holder'], "MB": round(holder['bytes'] / 1e6, 2)}
+            for holder in memory_report['top_holders']
+        ], hide_index=True)
+        st.write("Stages", {
+            name: f"{stats['allocated'] / stats['calls'] / 1e6:.1f} MB/call, peak {stats['peak'] / 1e6:.1f} MB"
+            for name, stats in memory_report['stages'].items()
+        })
 
 # Main content
 try:
-    if duration_type == "Historical Analysis":
-        spinner_text = f"Analyzing {symbol} liquidations over {time_period[0]} from {exchange}..."
+    replay_frames = []
+    served_warm = False
+    if duration_type == "Replay Archive":
+        # Replay reads the local archive only: the selected frame, and a
+        # thinned run of frames up to it for the build-up chart
+        if replay_at is not None:
+            selected = get_archive().query(exchange, symbol, start=replay_at, end=replay_at, stream=replay_stream)
+            data = selected[-1] if selected else None
+            replay_frames = get_archive().query(exchange, symbol, start=replay_start, end=replay_at,
+                                                stream=replay_stream, max_frames=REPLAY_CHART_FRAMES)
+        else:
+            data = None
     else:
-        spinner_text = f"Fetching real-time {symbol} data from {exchange}..."
-        
-    with st.spinner(spinner_text):
-        fetcher = LiquidationDataFetcher(exchange)
+        mode = HISTORICAL if duration_type == "Historical Analysis" else REALTIME
+        # Serve the warm snapshot while it is fresh enough for this refresh
+        # interval, or however old while a warm-up is loading fresh data
+        warm_age = warm_store.heatmap_age(exchange, symbol, mode, selected_timeframe, analysis_minutes)
+        warming = warm_store.is_warming()
+        data = None
+        if warm_age is not None and (warm_age <= refresh_interval or warming):
+            data = warm_store.load_heatmap(exchange, symbol, mode, selected_timeframe, analysis_minutes)
+        served_warm = data is not None
+    
+    if data is None and duration_type != "Replay Archive":
         if duration_type == "Historical Analysis":
-            data = fetcher.get_historical_liquidation_data(symbol, selected_timeframe, analysis_minutes)
+            spinner_text = f"Analyzing {symbol} liquidations over {time_period[0]} from {exchange}..."
         else:
-            data = fetcher.get_liquidation_heatmap_data(symbol)
+            spinner_text = f"Fetching real-time {symbol} data from {exchange}..."
+            
+        with st.spinner(spinner_text):
+            fetcher = LiquidationDataFetcher(exchange, tiered_depth=True, warm_store=warm_store)
+            progress = st.empty()
+            # Computation runs in the shared pool (which measures it in the worker
+            # process); updating the placeholder while waiting lets Streamlit
+            # stop the wait when the viewer navigates away
+            data = get_compute_pool().compute(
+                fetcher, symbol, mode, selected_timeframe, analysis_minutes,
+                on_wait=lambda elapsed: progress.caption(f"⏳ Computing heatmap... {elapsed:.0f}s")
+            )
+            progress.empty()
+        
+        if data:
+            try:
+                get_archive().append(exchange, data)
+            except Exception as e:
+                print(f"Error archiving snapshot: {e}")
+    
+    # What a render holds (snapshot, replay frames, figures) is kept per session
+    # and view under the memory budget; the previous snapshot gives price deltas
+    render_key = f"render:{exchange}:{symbol}:{duration_type}"
+    previous_render = memory_tracker.get(session_id, render_key)
+    previous_data = previous_render['data'] if previous_render else None
+    figures = []
     
     if data:
         # Show analysis type and additional info
         analysis_type = data.get('analysis_type', 'real-time')
         
-        if analysis_type == 'historical':
-            st.success(f"📊 Historical Analysis: {data['timeframe']} over {data.get('duration_minutes', 0)/60:.1f} hours")
+        if served_warm:
+            st.caption(f"🔥 Warm snapshot from {data['timestamp']:%H:%M:%S}"
+                       + (" • fresh data is loading in the background" if warming else ""))
+        
+        if data.get('replay'):
+            st.info(f"⏪ Archived {analysis_type} snapshot from {data['timestamp']:%Y-%m-%d %H:%M:%S}")
+        elif analysis_type == 'historical':
+            st.success(f"📊 Historical Analysis: {data['timeframe']} over {data.get('duration_minutes', 0)/60:.1f} hours "
+                       f"({len(data['ohlcv'])} × {data.get('candle_timeframe', '1h')} candles)")
             
             # Show historical price stats if available
             if 'price_stats' in data:
@@ -112,6 +234,11 @@ try:
                     st.metric("Volatility", f"{stats['volatility']*100:.2f}%")
         else:
             st.info("⚡ Real-time liquidation snapshot")
+            stale_tiers = [tier for tier in data.get('depth_tiers') or [] if tier['stale']]
+            if stale_tiers:
+                st.warning("⏱️ Stale order book depth: " + ", ".join(
+                    f"{tier['limit']} levels" for tier in stale_tiers
+                ))
         
         # Display current price prominently
         col1, col2, col3 = st.columns(3)
@@ -119,13 +246,13 @@ try:
             st.metric(
                 label=f"Current {symbol} Price",
                 value=f"${data['current_price']:,.2f}",
-                delta=None
+                delta=f"{data['current_price'] - previous_data['current_price']:+,.2f}" if previous_data else None
             )
         with col2:
             long_5x = data['liquidation_levels']['long_liquidations'][0]
             risk_emoji = "🔴" if long_5x.get('risk_level') == 'high' else "🟡" if long_5x.get('risk_level') == 'medium' else "🟢"
             st.metric(
-                label=f"{risk_emoji} Long 5x Liquidation",
+                label=f"{risk_emoji} Long {long_5x['leverage']}x Liquidation",
                 value=f"${long_5x['price']:,.2f}",
                 delta=f"-{long_5x['distance_percent']:.1f}%"
             )
@@ -133,7 +260,7 @@ try:
             short_5x = data['liquidation_levels']['short_liquidations'][0]
             risk_emoji = "🔴" if short_5x.get('risk_level') == 'high' else "🟡" if short_5x.get('risk_level') == 'medium' else "🟢"
             st.metric(
-                label=f"{risk_emoji} Short 5x Liquidation", 
+                label=f"{risk_emoji} Short {short_5x['leverage']}x Liquidation", 
                 value=f"${short_5x['price']:,.2f}",
                 delta=f"+{short_5x['distance_percent']:.1f}%"
             )
@@ -143,14 +270,31 @@ try:
         
         # Main heatmap
         st.subheader("📈 Liquidation Heatmap")
-        fig_heatmap = visualizer.create_interactive_heatmap(data)
+        with memory_tracker.stage('figures'):
+            fig_heatmap = visualizer.create_interactive_heatmap(data)
+        figures.append(fig_heatmap)
         st.plotly_chart(fig_heatmap, use_container_width=True)
         
+        if len(replay_frames) > 1:
+            st.subheader("⏪ Liquidation Build-up")
+            with memory_tracker.stage('figures'):
+                fig_replay = visualizer.create_replay_heatmap(replay_frames)
+            figures.append(fig_replay)
+            st.plotly_chart(fig_replay, use_container_width=True)
+        
         # Leverage analysis
         st.subheader("⚖️ Leverage Distribution")
-        fig_leverage = visualizer.create_leverage_distribution(data)
+        with memory_tracker.stage('figures'):
+            fig_leverage = visualizer.create_leverage_distribution(data)
+        figures.append(fig_leverage)
         st.plotly_chart(fig_leverage, use_container_width=True)
         
+        memory_tracker.put(session_id, render_key, {
+            'data': data,
+            'replay_frames': replay_frames,
+            'figures': figures
+        })
+        
         # Liquidation tables
         col1, col2 = st.columns(2)
         
@@ -182,6 +326,8 @@ try:
                 })
             st.dataframe(short_df, hide_index=True)
         
+    elif duration_type == "Replay Archive":
+        st.warning("📭 No archived snapshots for this symbol in the selected window.")
     else:
         st.error("❌ Failed to fetch data. Please try again.")
         
@@ -0,0 +1,74 @@
+import pandas as pd
+
+from alerts import AlertEngine, AlertRule, MemorySink
+
+
+def _heatmap(peaks, current_price=110.0):
+    """Heatmap with a local maximum of the given intensity at each price."""
+    prices = sorted({price + offset for price in peaks for offset in (-0.3, 0.0, 0.3)})
+    volumes = [peaks.get(price, 1.0) for price in prices]
+    return {'current_price': current_price,
+            'heatmap_data': pd.DataFrame({'price': prices, 'total_liquidation_volume': volumes})}
+
+
+def _engine(peaks, **rule):
+    sink = MemorySink()
+    engine = AlertEngine([sink])
+    spec = dict(rule_id='r1', symbol='BTC/USDT', max_distance_pct=1.0, min_intensity=10,
+                hysteresis=0.5, cooldown_seconds=300)
+    spec.update(rule)
+    engine.add_rule(AlertRule(**spec))
+    engine.update_heatmap('binance', 'BTC/USDT', _heatmap(peaks))
+    return engine, sink
+
+
+def _tick(engine, price, timestamp):
+    return engine.on_tick('binance', 'BTC/USDT', price, timestamp)
+
+
+def test_fires_within_distance_of_a_strong_enough_cluster():
+    engine, sink = _engine({100.0: 50.0, 120.0: 5.0})
+    assert _tick(engine, 105.0, 0) == []
+    assert _tick(engine, 119.5, 1) == []  # cluster below min_intensity
+    alerts = _tick(engine, 100.5, 2)
+    assert [(alert['cluster_price'], alert['side']) for alert in alerts] == [(100.0, 'long')]
+    assert sink.alerts == alerts
+
+
+def test_rearms_only_after_leaving_the_hysteresis_band():
+    engine, sink = _engine({100.0: 50.0}, cooldown_seconds=0)
+    assert len(_tick(engine, 100.5, 0)) == 1
+    assert _tick(engine, 100.4, 1) == []
+    # Out of the 1% band but inside the widened 1.5% one: still armed off
+    assert _tick(engine, 101.2, 2) == []
+    assert _tick(engine, 100.5, 3) == []
+    # Past the widened band: re-armed
+    assert _tick(engine, 102.0, 4) == []
+    assert len(_tick(engine, 100.5, 5)) == 1
+    assert len(sink.alerts) == 2
+
+
+def test_cooldown_blocks_refiring_and_expires():
+    engine, sink = _engine({100.0: 50.0}, cooldown_seconds=300)
+    assert len(_tick(engine, 100.5, 0)) == 1
+    _tick(engine, 102.0, 10)
+    assert _tick(engine, 100.5, 20) == []
+    _tick(engine, 102.0, 400)
+    assert len(_tick(engine, 100.5, 410)) == 1
+    assert len(sink.alerts) == 2
+
+
+def test_one_alert_per_rule_per_tick_for_the_strongest_cluster():
+    engine, sink = _engine({100.0: 50.0, 100.9: 80.0}, max_distance_pct=2.0)
+    alerts = _tick(engine, 100.5, 0)
+    assert [alert['cluster_price'] for alert in alerts] == [100.9]
+    assert _tick(engine, 100.6, 1) == []
+    assert len(sink.alerts) == 1
+
+
+def test_expired_cooldowns_are_forgotten():
+    engine, _ = _engine({100.0: 50.0}, cooldown_seconds=60)
+    _tick(engine, 100.5, 0)
+    assert len(engine._cooldown_until) == 1
+    _tick(engine, 105.0, 61)
+    assert engine._cooldown_until == {} and engine._cooldowns == []
@@ -0,0 +1,56 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import LiquidationBacktester
+
+ROWS = 400
+
+
+def _candles():
+    timestamps = 1_700_000_000_000 + np.arange(ROWS, dtype=np.int64) * 60_000
+    close = 60000 * (1 + 0.05 * np.sin(np.linspace(0, 12, ROWS)))
+    return pd.DataFrame({'timestamp': timestamps, 'open': close, 'high': close * 1.002,
+                         'low': close * 0.998, 'close': close, 'volume': np.ones(ROWS)})
+
+
+def _write(path, frame, header, gzipped=False):
+    text = frame.to_csv(index=False, header=header)
+    if gzipped:
+        with gzip.open(path, 'wt') as handle:
+            handle.write(text)
+    else:
+        path.write_text(text)
+    return str(path)
+
+
+@pytest.fixture
+def backtester():
+    return LiquidationBacktester(lookback=60, horizon=30, chunk_size=97)
+
+
+@pytest.fixture
+def expected(tmp_path, backtester):
+    return backtester.run_file(_write(tmp_path / 'expected.csv', _candles(), header=True))
+
+
+@pytest.mark.parametrize('header', [
+    False,
+    ['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+    ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'],
+    [' TIMESTAMP', 'Open ', 'HIGH', 'low', 'Close', 'Volume'],
+])
+def test_headers(tmp_path, backtester, expected, header):
+    path = _write(tmp_path / 'candles.csv', _candles(), header=header)
+    assert backtester.run_file(path) == expected
+
+
+def test_iso_timestamps_and_extra_columns(tmp_path, backtester, expected):
+    frame = _candles()
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='ms', utc=True).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    frame['Trades'] = 1
+    frame.columns = [name.capitalize() for name in frame.columns]
+    path = _write(tmp_path / 'candles.csv.gz', frame, header=True, gzipped=True)
+    assert backtester.run_file(path) == expected
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from data_fetcher import LiquidationDataFetcher
+from leverage_engine import DEFAULT_LEVERAGE_LEVELS, get_level_engine, level_multipliers, side_arrays
+
+DENSE_LEVELS = list(range(1, 126))
+PRICE = 60000.0
+
+
+def _order_book(price):
+    offsets = np.linspace(0.0005, 0.05, 200)
+    return {'bids': [[price * (1 - offset), 1.0] for offset in offsets],
+            'asks': [[price * (1 + offset), 1.0] for offset in offsets]}
+
+
+def _ohlcv(price, rows=200):
+    close = price * (1 + 0.02 * np.sin(np.linspace(0, 6, rows)))
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=rows, freq='h'),
+                         'open': close, 'high': close * 1.01, 'low': close * 0.99,
+                         'close': close, 'volume': np.ones(rows)})
+
+
+def _peak_multipliers(leverage_levels):
+    fetcher = LiquidationDataFetcher(leverage_levels=leverage_levels)
+    book = _order_book(PRICE)
+    levels = fetcher.calculate_liquidation_levels(PRICE)
+    price_grid = fetcher.estimate_liquidation_volume(book, levels)['price'].to_numpy()
+    real_time = max(level_multipliers(price_grid, *side_arrays(levels, side), 0.001).max()
+                    for side in ('long_liquidations', 'short_liquidations'))
+
+    ohlcv = _ohlcv(PRICE)
+    enhanced = fetcher.calculate_enhanced_liquidation_levels(
+        PRICE, ohlcv['low'].min(), ohlcv['high'].max(), 0.02)
+    empty = {'long_liquidations': [], 'short_liquidations': []}
+    historical = fetcher.generate_historical_heatmap(ohlcv, enhanced, 60)
+    historical_base = fetcher.generate_historical_heatmap(ohlcv, empty, 60)
+
+    def peak(boosted, plain):
+        plain = plain.to_numpy()
+        mask = plain > 0
+        return (boosted.to_numpy()[mask] / plain[mask]).max()
+
+    return (real_time,
+            max(peak(historical['long_liquidation_volume'], historical_base['long_liquidation_volume']),
+                peak(historical['short_liquidation_volume'], historical_base['short_liquidation_volume'])))
+
+
+def test_dense_grid_does_not_blow_up_intensity():
+    default_real_time, default_historical = _peak_multipliers(DEFAULT_LEVERAGE_LEVELS)
+    dense_real_time, dense_historical = _peak_multipliers(DENSE_LEVELS)
+    ceiling = np.prod(1 + np.asarray(DEFAULT_LEVERAGE_LEVELS) / 100)
+
+    assert default_real_time > 1 and default_historical > 1
+    assert dense_real_time <= ceiling + 1e-9
+    assert dense_historical <= ceiling + 1e-9
+
+
+def test_levels_use_exact_price():
+    engine = get_level_engine([5], [(50000, 125, 0.004), (float('inf'), 20, 0.01)])
+    levels = engine.levels(PRICE + 0.37)
+    long_level = levels['long_liquidations'][0]
+    assert long_level['price'] == (PRICE + 0.37) * (1 - 1 / 5 + 0.004)
+    assert abs(long_level['distance_percent'] - 19.6) < 1e-9
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import snapshot_archive
+from snapshot_archive import SnapshotArchive
+
+DAY = 86400
+
+
+def _snapshot(timestamp, analysis_type='real-time', timeframe=None):
+    return {'symbol': 'BTC/USDT', 'current_price': 60000.0, 'timestamp': timestamp,
+            'analysis_type': analysis_type, 'timeframe': timeframe,
+            'liquidation_levels': {'long_liquidations': [], 'short_liquidations': []},
+            'heatmap_data': pd.DataFrame({'price': np.linspace(1, 2, 5), 'intensity': np.ones(5)})}
+
+
+def test_idle_streams_are_pruned(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), retention_days=30, compact_after_hours=24,
+                              compact_interval_seconds=300, min_interval_seconds=0)
+    now = time.time()
+    # An idle historical stream with a single open chunk past retention
+    archive.append('binance', _snapshot(now - 40 * DAY, 'historical', '3M'))
+    # A real-time stream whose open chunk is past compaction age
+    for i in range(10):
+        archive.append('binance', _snapshot(now - 2 * DAY + i * 60))
+    archive.maintain()
+
+    assert archive.streams('binance', 'BTC/USDT') == ['real-time']
+    assert len(archive.timestamps('binance', 'BTC/USDT')) == 2
+
+    # The next append starts a new chunk after the compacted one
+    archive.maintain_interval_seconds = 0
+    assert archive.append('binance', _snapshot(now))
+    assert len(archive.query('binance', 'BTC/USDT')) == 3
+
+
+def test_queries_survive_compaction(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), chunk_frames=5, compact_after_hours=0,
+                              compact_interval_seconds=120, min_interval_seconds=0,
+                              maintain_interval_seconds=float('inf'))
+    start = time.time() - DAY
+    for i in range(40):
+        archive.append('binance', _snapshot(start + i * 60))
+
+    errors = []
+
+    def read():
+        try:
+            for _ in range(50):
+                archive.query('binance', 'BTC/USDT')
+        except Exception as error:  # noqa: BLE001 - any failure fails the test
+            errors.append(error)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    archive.maintain()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    assert len(archive.query('binance', 'BTC/USDT')) == 24
+
+
+def test_get_archive_is_a_singleton(monkeypatch, tmp_path):
+    monkeypatch.setenv('LIQ_ARCHIVE_DIR', str(tmp_path))
+    monkeypatch.setattr(snapshot_archive, '_archive', None)
+    found = []
+    threads = [threading.Thread(target=lambda: found.append(snapshot_archive.get_archive())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(archive) for archive in found}) == 1
+    assert os.path.samefile(found[0].root, tmp_path)
@@ -108,6 +108,11 @@ else
     print_warning "No containers were running or docker-compose failed"
 fi
 
+# The container runs as appuser (uid 1000) and writes the warm snapshot
+# and archive to the bind-mounted data directory
+mkdir -p data
+sudo chown -R 1000:1000 data
+
 # Build and start updated containers
 print_status "Building and starting updated containers..."
 if sudo docker-compose up -d --build; then
@@ -119,9 +124,22 @@ else
     exit 1
 fi
 
-# Wait for containers to be ready
-print_status "Waiting for application to start..."
-sleep 10
+# Wait for the warm-up: the container only reports healthy once warm
+print_status "Waiting for application to warm up..."
+CONTAINER_ID=$(sudo docker-compose ps -q liquidation-heatmap)
+HEALTH_STATUS="starting"
+for i in $(seq 1 36); do
+    HEALTH_STATUS=$(sudo docker inspect --format '{{.State.Health.Status}}' "$CONTAINER_ID" 2>/dev/null || echo "unknown")
+    if [ "$HEALTH_STATUS" = "healthy" ]; then
+        break
+    fi
+    sleep 5
+done
+if [ "$HEALTH_STATUS" = "healthy" ]; then
+    print_success "Application is warm"
+else
+    print_warning "Application not warm yet (health: $HEALTH_STATUS), serving the last warm snapshot meanwhile"
+fi
 
 # Check container status
 print_status "Checking container status..."
@@ -156,6 +174,7 @@ echo "   🕒 New duration options (12h, 24h, 2d, 3d)"
 echo "   📊 Enhanced historical analysis"
 echo "   🎯 Risk level indicators (🟢🟡🔴)"
 echo "   📈 Improved liquidation calculations"
+echo "   🔥 Warm start: served from the last snapshot right after deploys"
 echo ""
 echo "🔧 Management commands:"
 echo "   📊 View logs: sudo docker-compose logs -f"